@@ -0,0 +1,48 @@
+"""
+Generators of DSD input files of scalable size.
+
+A cascade of n gates passes a signal through n translator gates. Gate i holds its output strand
+<x_i t_{i+1}^ x_{i+1}> on the base <t_{i+1}^* x_i* t_i^*>; the signal <x_{i-1} t_i^ x_i> binds the free
+toehold t_i^*, displaces x_i and the output is released as the signal of gate i + 1.
+"""
+import os
+
+KINETICS = [('RB', 0.0003), ('RU', 0.1126), ('R3', 20), ('R4', 5.6e-3), ('RB_2', 0.0003)]
+'''reaction rates written to the generated inputs'''
+
+
+def generate_cascade(n, signal=1000, gate=1500, simupara=(1000, 100)):
+    """
+    generate the input of a cascade of translator gates
+
+    :param n: number of gates
+    :param signal: concentration of the input signal
+    :param gate: concentration of every gate
+    :param simupara: simulation time and steps
+    :return: text of the input file
+    """
+    species = ['<x0 t1^ x1>\n']
+    names = ['signal ' + str(signal) + '\n']
+    for i in range(1, n + 1):
+        species.append('<x%d!1 t%d^!2 x%d>\n<t%d^*!2 x%d*!1 t%d^*>\n' % (i, i + 1, i + 1, i + 1, i, i))
+        names.append('gate%d %d\n' % (i, gate))
+
+    text = '//\n'.join(species)
+    text += '--\n' + ''.join(names)
+    text += '--\n' + ''.join(name + ' ' + str(rate) + '\n' for name, rate in KINETICS)
+    text += '--\n' + str(simupara[0]) + ' ' + str(simupara[1]) + '\n'
+    return text
+
+
+def write_cascade(n, dirname, **kwargs):
+    """
+    write the input of a cascade of n gates to dirname/cascade_n
+
+    :return: path of the input file
+    """
+    if not os.path.exists(dirname):
+        os.makedirs(dirname)
+    filedir = os.path.join(dirname, 'cascade_' + str(n))
+    with open(filedir, 'w') as fp:
+        fp.write(generate_cascade(n, **kwargs))
+    return filedir
@@ -0,0 +1,108 @@
+"""
+Peak memory of the reaction network enumeration.
+
+Every input file is enumerated in a fresh interpreter, so the peak resident set size of one input
+is not hidden by an earlier one. Inputs default to the files in res.
+
+    python benchmark/memory.py [--maxiter N] [input ...]
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+'''root of the repository'''
+
+
+def get_peak_rss():
+    """
+    :return: peak resident set size of the current process in KiB
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak //= 1024
+    return peak
+
+
+def measure(filedir, maxiter=10):
+    """
+    enumerate the reaction network of one input file in the current process
+
+    :param filedir: path of the input file
+    :param maxiter: maximum number of enumeration rounds, None for no limit. Some inputs (catalytic_kotani)
+        never finish without one
+    :return: dictionary of the network size, time and peak memory
+    """
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from src.basics import graph_processor
+
+    base = get_peak_rss()
+    start = time.time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        info = graph_processor.initiation(filedir=filedir)[0]
+        rounds = 0
+        while not info[4].empty() and (maxiter is None or rounds < maxiter):
+            info = graph_processor.one_iteration(*info)
+            rounds += 1
+    peak = get_peak_rss()
+
+    return {'input': filedir,
+            'rounds': rounds,
+            'species': len(info[0]),
+            'reactions': len(info[2]),
+            'time': time.time() - start,
+            'peak_rss': peak,
+            'enumeration_rss': peak - base}
+
+
+def run(filedir, maxiter=10):
+    """
+    measure one input file in a new interpreter
+
+    :return: dictionary returned by measure(), or with an 'error' entry if the run failed
+    """
+    cmd = [sys.executable, os.path.abspath(__file__), '--single', filedir]
+    if maxiter is not None:
+        cmd += ['--maxiter', str(maxiter)]
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    if proc.returncode != 0:
+        lines = proc.stderr.strip().splitlines()
+        return {'input': filedir, 'error': lines[-1] if lines else 'exit code ' + str(proc.returncode)}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='peak memory of the reaction network enumeration')
+    parser.add_argument('inputs', nargs='*', help='DSD input files, the files in res by default')
+    parser.add_argument('--maxiter', type=int, default=10,
+                        help='maximum number of enumeration rounds, 10 like the threshold of start_processor')
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(measure(args.inputs[0], args.maxiter)))
+        return
+
+    inputs = args.inputs or sorted(glob.glob(os.path.join(ROOT, 'res', '*')))
+    print('%-24s %7s %9s %10s %9s %14s %16s' % ('input', 'rounds', 'species', 'reactions', 'time(s)',
+                                               'peak RSS(KiB)', 'enumeration(KiB)'))
+    for filedir in inputs:
+        res = run(filedir, args.maxiter)
+        name = os.path.basename(filedir)
+        if 'error' in res:
+            print('%-24s failed: %s' % (name, res['error']))
+        else:
+            print('%-24s %7d %9d %10d %9.2f %14d %16d' % (name, res['rounds'], res['species'], res['reactions'],
+                                                          res['time'], res['peak_rss'], res['enumeration_rss']))
+
+
+if __name__ == '__main__':
+    main()
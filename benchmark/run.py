@@ -0,0 +1,135 @@
+"""
+Time the phases of processing DSD inputs: parse, enumerate, model build, simulate and output.
+
+Inputs default to the files in res; --cascade adds generated cascades of the given numbers of
+gates (see circuits.py) for scaling curves.
+
+    python benchmark/run.py [--maxiter N] [--simulator bng|scipy|ode|ssa|none] [--cascade 1,2,4,...] [--json FILE] [input ...]
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+'''root of the repository'''
+
+sys.path.insert(0, ROOT)
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from benchmark import circuits
+from src.basics import initialize_system, graph_processor, generate_pysbmodel, output
+from src.basics import worklist as wl, simulator as sim
+
+PHASES = ['parse', 'enumerate', 'model', 'simulate', 'output']
+'''phases timed for every input'''
+
+
+def run_phases(filedir, outdir, maxiter=None, simulator='bng'):
+    """
+    process one input file and time every phase, a failing phase ends the run
+
+    :param filedir: path of the input file
+    :param outdir: directory the output files are written to
+    :param maxiter: maximum number of enumeration rounds, None for no limit
+    :param simulator: 'bng', 'scipy', 'ode' or 'ssa' (native, no PySB model), or 'none' to skip the simulation
+    :return: dictionary with the time of every finished phase, the network size and the error if any
+    """
+    res = {'input': filedir, 'times': {}}
+    state = {}
+
+    def parse():
+        specieslist, speciesidmap, kinetics, names, concentrations, _, simupara = initialize_system.initialize(filedir)
+        if len(simupara) == 0:
+            simupara = [100, 100]
+        names += ['ss_' + str(i + 1) for i in range(len(names), len(specieslist))]
+        state.update(specieslist=specieslist, speciesidmap=speciesidmap, kinetics=kinetics, names=names,
+                     concentrations=concentrations, simupara=simupara, initlen=len(specieslist))
+
+    def enumerate_network():
+        info = (state['specieslist'], state['speciesidmap'], [], state['kinetics'],
+                wl.Worklist(len(state['specieslist'])))
+        rounds = 0
+        while not info[4].empty() and (maxiter is None or rounds < maxiter):
+            info = graph_processor.one_iteration(*info)
+            rounds += 1
+        state.update(specieslist=info[0], reactionlist=info[2])
+        res.update(rounds=rounds, species=len(info[0]), reactions=len(info[2]))
+
+    def model():
+        if simulator == 'ode' or simulator == 'ssa':
+            state['model'] = sim.Network(state['specieslist'], state['reactionlist'], state['initlen'],
+                                                state['names'], state['concentrations'])
+        else:
+            state['model'] = generate_pysbmodel.generate_model(state['specieslist'], state['reactionlist'],
+                                                               state['initlen'], state['names'],
+                                                               state['concentrations'])
+
+    def simulate():
+        if simulator == 'none' or len(state['reactionlist']) == 0:
+            return
+        t, steps = float(state['simupara'][0]), int(state['simupara'][1])
+        if simulator == 'ode':
+            sim.simulate_ode(state['model'], time=t, steps=steps)
+        elif simulator == 'ssa':
+            sim.simulate_ssa(state['model'], time=t, steps=steps)
+        elif simulator == 'bng':
+            output.simulate_bng(state['model'], time=t, steps=steps)
+        else:
+            output.simulate_scipy(state['model'], time=t, steps=steps, filedir=outdir)
+
+    def write():
+        output.output_network_txt(state['specieslist'], state['reactionlist'], filedir=outdir)
+
+    for name, func in zip(PHASES, [parse, enumerate_network, model, simulate, write]):
+        start = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                func()
+        except Exception as e:
+            res['error'] = name + ': ' + type(e).__name__ + ': ' + str(e)
+            break
+        res['times'][name] = time.perf_counter() - start
+    return res
+
+
+def main():
+    parser = argparse.ArgumentParser(description='time the phases of processing DSD inputs')
+    parser.add_argument('inputs', nargs='*', help='DSD input files, the files in res by default')
+    parser.add_argument('--maxiter', type=int, default=10,
+                        help='maximum number of enumeration rounds, 10 like the threshold of start_processor')
+    parser.add_argument('--simulator', choices=['bng', 'scipy', 'ode', 'ssa', 'none'], default='bng')
+    parser.add_argument('--cascade', default='', help='comma separated numbers of gates of generated cascades')
+    parser.add_argument('--json', default=None, help='file to write the results to')
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='dsdpy_benchmark_')
+    inputs = args.inputs
+    if len(inputs) == 0 and args.cascade == '':
+        inputs = sorted(glob.glob(os.path.join(ROOT, 'res', '*')))
+    if args.cascade != '':
+        inputs = inputs + [circuits.write_cascade(int(n), tmpdir) for n in args.cascade.split(',')]
+
+    results = []
+    print('%-20s %8s %9s' % ('input', 'species', 'reactions') + ''.join('%11s' % p for p in PHASES))
+    for filedir in inputs:
+        res = run_phases(filedir, tmpdir, args.maxiter, args.simulator)
+        results.append(res)
+        line = '%-20s %8s %9s' % (os.path.basename(filedir), res.get('species', '-'), res.get('reactions', '-'))
+        line += ''.join('%11.3f' % res['times'][p] if p in res['times'] else '%11s' % '-' for p in PHASES)
+        if 'error' in res:
+            line += '  failed in ' + res['error']
+        print(line)
+
+    if args.json is not None:
+        with open(args.json, 'w') as fp:
+            json.dump(results, fp, indent=1)
+
+
+if __name__ == '__main__':
+    main()
@@ -17,6 +17,7 @@ class MyWindow(QMainWindow, uiwindow.Ui_MainWindow):
         self.lock = None
         self.simuarg = None
         self.simumode = 'bng'
+        self.runs = 1
         self.paused = False
         self.canvas = None
         self.setupUi(self)
@@ -50,9 +51,29 @@ class MyWindow(QMainWindow, uiwindow.Ui_MainWindow):
                                                           "All Files (*);;Text Files (*.txt)")
         if fname:
             self.debugPrint("Reading File.")
+            try:
+                with open(fname, 'r') as fp:
+                    text = fp.read()
+            except (OSError, UnicodeDecodeError) as ex:
+                self.debugPrint('Cannot read file: ' + str(ex))
+                return
+            if '-----Incidence Matrix-----\n' in text:
+                # network written by a previous run, shown as output instead of input
+                self.load_network_txt(text)
+                return
             self.model.set_filename(fname)
             self.refresh()
 
+    def load_network_txt(self, text):
+        try:
+            edges, matrix = output.read_incidence_matrix(text)
+        except Exception as ex:
+            self.debugPrint('Not a network output file: ' + str(ex))
+            return
+        self.debugPrint('Loaded network with %d species and %d edges.' % (matrix.shape[0], len(edges)))
+        self.display_output_txt(text)
+        self.pushButton_save.setEnabled(True)
+
     def runSlot(self):
         pass
 
@@ -84,15 +105,20 @@ class MyWindow(QMainWindow, uiwindow.Ui_MainWindow):
     def submitSlot(self):
         if not self.procthread:
             return
-        specieslist, speciesidmap, reactionlist, kinetics, indexlist, cursor, visited = self.procthread.get_arg_info()
+        specieslist, speciesidmap, reactionlist, kinetics, worklist = self.procthread.get_arg_info()
         initnames, concentrations, outdir, simupara, initlen = self.simuarg
+        var = None
         try:
-            x, y, obs = graph_processor.simulation(specieslist, reactionlist, initlen, initnames, concentrations,
-                                                   outdir, simupara, self.simumode)
+            if self.runs > 1:
+                x, y, var, obs = graph_processor.ensemble_simulation(specieslist, reactionlist, initlen, initnames,
+                                                                     concentrations, simupara, self.runs)
+            else:
+                x, y, obs = graph_processor.simulation(specieslist, reactionlist, initlen, initnames, concentrations,
+                                                       outdir, simupara, self.simumode)
         except Exception as ex:
             self.debugPrint(str(ex))
             return
-        self.display_output_img(x, y, obs, option=self.simumode)
+        self.display_output_img(x, y, obs, option=self.simumode, var=var)
 
     def analyzeSlot(self):
         # Take care of submitting more than once
@@ -200,7 +226,7 @@ class MyWindow(QMainWindow, uiwindow.Ui_MainWindow):
     def showSlot(self):
         if not self.procthread:
             return
-        specieslist, speciesidmap, reactionlist, kinetics, indexlist, cursor, visited = self.procthread.get_arg_info()
+        specieslist, speciesidmap, reactionlist, kinetics, worklist = self.procthread.get_arg_info()
         try:
             text = graph_processor.post_enumeration(specieslist, reactionlist)
         except:
@@ -225,10 +251,18 @@ class MyWindow(QMainWindow, uiwindow.Ui_MainWindow):
 
     def simuSlot(self):
         mode = self.comboBox_simumode.currentText()
+        self.runs = 1
         if mode == 'Stochastic':
             self.simumode = 'bng'
-        else:
+        elif mode == 'Deterministic':
             self.simumode = 'scipy'
+        elif mode == 'Stochastic (native)':
+            self.simumode = 'ssa'
+        elif mode == 'Deterministic (native)':
+            self.simumode = 'ode'
+        else:
+            self.simumode = 'ssa'
+            self.runs = 100
         self.debugPrint('Simulation mode set to ' + mode)
 
     def debugPrint(self, msg):
@@ -238,7 +272,7 @@ class MyWindow(QMainWindow, uiwindow.Ui_MainWindow):
         self.reneTextBrowser.setText(text)
         # self.textBrowser.append(open(fname, 'r').read())
 
-    def display_output_img(self, x, y, obs, colormap='tab10', option='bng'):
+    def display_output_img(self, x, y, obs, colormap='tab10', option='bng', var=None):
         obslen = len(obs)
         if self.canvas is None:
             sc = output.Canvas(self, width=5, height=6, dpi=100)
@@ -261,8 +295,11 @@ class MyWindow(QMainWindow, uiwindow.Ui_MainWindow):
 
         for i in range(0, obslen):
             label = obs[i].name[3:]
-            if option == 'bng':
+            if option in ('bng', 'ode', 'ssa'):
                 sc.axes.plot(x, y[:, i], label=label, c=cmap(i))
+                if var is not None:
+                    std = var[:, i] ** 0.5
+                    sc.axes.fill_between(x, y[:, i] - std, y[:, i] + std, color=cmap(i), alpha=0.2, linewidth=0)
             elif option == 'scipy':
                 sc.axes.plot(x, y[obs[i].name], label=label, c=cmap(i))
 
@@ -0,0 +1,93 @@
+"""
+Resource budgets of the enumeration. one_iteration() checks the budget after every expansion and stops the
+round once a budget is used up; the species that were not fully expanded are flagged as truncated in the
+worklist, so the network found so far can still be simulated and written.
+"""
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows, the RSS budget is not checked there
+    resource = None
+
+
+def get_rss():
+    """
+    :return: peak resident set size of this process in MB, 0 if unknown
+    """
+    if resource is None:
+        return 0.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / (1024. * 1024.) if sys.platform == 'darwin' else rss / 1024.
+
+
+class Budget:
+    """
+    Limits of an enumeration, None for no limit
+    """
+
+    maxspecies = None
+    '''the enumeration stops once there are this many species'''
+
+    maxreactions = None
+    '''the enumeration stops once there are this many reactions'''
+
+    maxstrands = None
+    '''species with more strands are kept but never expanded'''
+
+    walltime = None
+    '''seconds after start() the enumeration stops'''
+
+    maxrss = None
+    '''peak resident set size in MB at which the enumeration stops'''
+
+    starttime = 0.
+    '''time start() was called'''
+
+    reason = None
+    '''name of the budget that stopped the enumeration, None while all budgets hold'''
+
+    def __init__(self, maxspecies=None, maxreactions=None, maxstrands=None, walltime=None, maxrss=None):
+        self.maxspecies = maxspecies
+        self.maxreactions = maxreactions
+        self.maxstrands = maxstrands
+        self.walltime = walltime
+        self.maxrss = maxrss
+        self.reason = None
+        self.start()
+
+    def start(self):
+        """
+        start the wall time budget
+        """
+        self.starttime = time.perf_counter()
+
+    def exceeded(self, specieslist, reactionlist):
+        """
+        check the budgets, the first budget found used up is kept in reason
+
+        :param specieslist: list of species
+        :param reactionlist: list of reactions
+        :return: True if the enumeration has to stop
+        """
+        if self.reason is not None:
+            return True
+        if self.maxspecies is not None and len(specieslist) >= self.maxspecies:
+            self.reason = 'species'
+        elif self.maxreactions is not None and len(reactionlist) >= self.maxreactions:
+            self.reason = 'reactions'
+        elif self.walltime is not None and time.perf_counter() - self.starttime >= self.walltime:
+            self.reason = 'walltime'
+        elif self.maxrss is not None and get_rss() >= self.maxrss:
+            self.reason = 'rss'
+        return self.reason is not None
+
+    def too_large(self, species):
+        """
+        :param species: a Species object
+        :return: True if the species has more strands than allowed
+        """
+        return self.maxstrands is not None and len(species.strands) > self.maxstrands
@@ -1,3 +1,6 @@
+from src.util import trace
+
+
 def check_binding(graph):
     """
     check rule binding
@@ -5,6 +8,7 @@ def check_binding(graph):
     :param graph: a StrandGraph object
     :return: edges to be added
     """
+    debug = trace.enabled(trace.DEBUG)
     changeedge = []
     for i in graph.A:
         if i not in graph.E:
@@ -12,7 +16,8 @@ def check_binding(graph):
                 if not graph.check_toehold(i):
                     continue
             if graph.available(i):
-                print("RB: " + str(i.copy()))
+                if debug:
+                    trace.emit(trace.DEBUG, 'RB', i)
                 changeedge.append(i)
     return changeedge
 
@@ -24,11 +29,13 @@ def check_unbinding(graph):
     :param graph: a StrandGraph object
     :return: edges to be deleted
     """
+    debug = trace.enabled(trace.DEBUG)
     changeedge = []
     for i in graph.E:
         if graph.check_toehold(i):
             if not graph.anchored(i):
-                print("RU: " + str(i.copy()))
+                if debug:
+                    trace.emit(trace.DEBUG, 'RU', i)
                 changeedge.append(i)
     return changeedge
 
@@ -55,6 +62,7 @@ def check_migration(graph):
     :return: changeedge3: edges to be changed in three-way migration
              changeedge4: edges to be changed in four-way migration
     """
+    debug = trace.enabled(trace.DEBUG)
     changeedge3 = []
     changeedge4 = []
     for i in graph.A:
@@ -64,11 +72,13 @@ def check_migration(graph):
                 if len(tbr) != 0 and len(r) != 0:
                     if notbond is None:
                         if graph.check_switchable_2(i, tbr):
-                            print("R4: " + str(i.copy()))
+                            if debug:
+                                trace.emit(trace.DEBUG, 'R4', i)
                             changeedge4.append((i, set(r), tbr[0], tbr[1]))
                     else:
                         if graph.check_switchable(notbond, tbr[0], i):
-                            print("R3: " + str(i.copy()))
+                            if debug:
+                                trace.emit(trace.DEBUG, 'R3', i)
                             changeedge3.append((i, tbr[0]))
     return changeedge3, changeedge4
 
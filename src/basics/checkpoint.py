@@ -0,0 +1,79 @@
+"""
+Checkpoints of the enumeration state. A checkpoint is a directory holding the species and reactions in the
+binary format of network_file and a JSON file with the worklist, the kinetics and the settings of the input,
+so an enumeration can continue from the last completed round.
+"""
+from src.basics import network_file as nf, worklist as wl
+from bidict import bidict
+import json
+import os
+import shutil
+
+
+def save_checkpoint(dirname, info, initnames, concentrations, outdir, simupara, initlen):
+    """
+    write a checkpoint. It is written to a temporary directory first and then replaces the previous checkpoint,
+    so a run stopped while writing keeps the previous one.
+
+    :param dirname: directory of the checkpoint
+    :param info: enumeration state (specieslist, speciesidmap, reactionlist, kinetics, worklist)
+    :param initnames: names of the initial species
+    :param concentrations: concentrations of the initial species
+    :param outdir: output directory of the input
+    :param simupara: simulation settings of the input
+    :param initlen: number of initial species
+    """
+    specieslist, speciesidmap, reactionlist, kinetics, worklist = info
+    tmpdir = dirname + '.tmp'
+    if os.path.exists(tmpdir):
+        shutil.rmtree(tmpdir)
+    nf.write_network(tmpdir + '/network', specieslist, reactionlist)
+    with open(tmpdir + '/state.json', 'w') as fp:
+        json.dump({'kinetics': kinetics,
+                   'worklist': worklist.to_record(),
+                   'initnames': initnames,
+                   'concentrations': list(concentrations),
+                   'outdir': outdir,
+                   'simupara': list(simupara),
+                   'initlen': initlen}, fp)
+
+    olddir = dirname + '.old'
+    if os.path.exists(dirname):
+        os.rename(dirname, olddir)
+    os.rename(tmpdir, dirname)
+    if os.path.exists(olddir):
+        shutil.rmtree(olddir)
+
+
+def exists(dirname):
+    """
+    :param dirname: directory of the checkpoint
+    :return: True if there is a complete checkpoint
+    """
+    return os.path.exists(dirname + '/state.json') or os.path.exists(dirname + '.old/state.json')
+
+
+def load_checkpoint(dirname):
+    """
+    read a checkpoint written by save_checkpoint()
+
+    :param dirname: directory of the checkpoint
+    :return: the enumeration state, initnames, concentrations, outdir, simupara and initlen like
+        graph_processor.initiation()
+    """
+    if not os.path.exists(dirname + '/state.json'):
+        # stopped between the two renames of save_checkpoint()
+        dirname = dirname + '.old'
+    with open(dirname + '/state.json') as fp:
+        state = json.load(fp)
+
+    network = nf.NetworkFile(dirname + '/network', mmap=False)
+    specieslist = list(network.specieslist)
+    reactionlist = list(network.reactionlist)
+    speciesidmap = bidict()
+    for species in specieslist:
+        speciesidmap.put(species.id, species.key)
+    worklist = wl.Worklist.from_record(state['worklist'])
+
+    return (specieslist, speciesidmap, reactionlist, state['kinetics'], worklist), state['initnames'], \
+        state['concentrations'], state['outdir'], state['simupara'], state['initlen']
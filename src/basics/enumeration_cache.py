@@ -0,0 +1,113 @@
+from src.species import species as sp
+import hashlib
+import json
+import os
+import sqlite3
+
+RULE_MODULES = ['basics/check_rules.py',
+                'basics/lexical_analyzer.py',
+                'reaction/reaction.py',
+                'species/reaction_cache.py',
+                'species/species.py',
+                'species/species_explore.py',
+                'strand/bond.py',
+                'strand/bond_graph.py',
+                'strand/edge_set.py',
+                'strand/strand.py',
+                'strand/strand_graph.py',
+                'util/cexception.py',
+                'util/trace.py',
+                'util/traversal_queue.py',
+                'util/util.py']
+'''source files (relative to src) that decide which reactions are found and how cached species are decoded:
+species_explore, species and every module of src they import'''
+
+
+def get_rule_version():
+    """
+    hash the source of the rule implementation, cached results of another version are never used
+
+    :return: hex digest
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    h = hashlib.sha1()
+    for name in RULE_MODULES:
+        with open(os.path.join(root, name), 'rb') as fp:
+            h.update(fp.read())
+    return h.hexdigest()
+
+
+class EnumerationCache:
+    """
+    On-disk cache of mono- and bi-molecule reactions, shared by all runs that use the same file.
+    Entries are keyed by the canonical key(s) of the reactants and the rule version.
+    """
+
+    filename = ''
+    '''path of the SQLite file'''
+
+    version = ''
+    '''rule version of the entries read and written'''
+
+    connection = None
+    '''SQLite connection'''
+
+    hits = 0
+    '''number of successful lookups'''
+
+    misses = 0
+    '''number of failed lookups'''
+
+    def __init__(self, filename, version=None):
+        self.filename = filename
+        self.version = version if version is not None else get_rule_version()
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS reactions '
+                                '(key TEXT NOT NULL, version TEXT NOT NULL, reactions TEXT NOT NULL, '
+                                'PRIMARY KEY (key, version))')
+
+    @staticmethod
+    def encode_key(key):
+        """
+        :param key: key built by ReactionCache.get_key()
+        :return: string form of the key
+        """
+        return json.dumps([[k.hex(), list(colors)] for k, colors in key], separators=(',', ':'))
+
+    def get(self, key):
+        """
+        look up the reactions of a key
+
+        :param key: key built by ReactionCache.get_key()
+        :return: list of (rule name, product species), None if not cached
+        """
+        row = self.connection.execute('SELECT reactions FROM reactions WHERE key = ? AND version = ?',
+                                      (self.encode_key(key), self.version)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [(rule, [sp.Species.from_record(p) for p in products]) for rule, products in json.loads(row[0])]
+
+    def put(self, key, reactions):
+        """
+        store the reactions of a key, written to disk on the next flush()
+
+        :param key: key built by ReactionCache.get_key()
+        :param reactions: list of Reaction objects found for the key
+        """
+        value = [(r.rule, [p.to_record() for p in r.products]) for r in reactions]
+        self.connection.execute('INSERT OR REPLACE INTO reactions VALUES (?, ?, ?)',
+                                (self.encode_key(key), self.version, json.dumps(value, separators=(',', ':'))))
+
+    def flush(self):
+        """
+        commit the entries written so far
+        """
+        self.connection.commit()
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
@@ -1,6 +1,11 @@
 from src.species import species_explore as se
-from src.util import util, cexception
+from src.util import cexception, trace, profiler
 from src.basics import output as on, generate_pysbmodel as gp, initialize_system,initialize_system_str
+from src.basics import worklist as wl, simulator as sim, checkpoint as cp
+import multiprocessing
+
+BUDGET_BATCH = 256
+'''number of tasks expanded in parallel between two checks of the budget'''
 
 
 def initiation(filedir=None, text=None):
@@ -33,44 +38,211 @@ def initiation(filedir=None, text=None):
         raise cexception.SpeciesError("there are more initial species names than the number of initial species")
 
     reactionlist = []
-    visited = [False for _ in range(0, len(specieslist))]
-    indexlist = []
-    cursor = 0
+    worklist = wl.Worklist(len(specieslist))
+
+    return (specieslist, speciesidmap, reactionlist, kinetics, worklist), initnames, concentrations, outdir, simupara, initlen
+
+
+def resume(dirname):
+    """
+    continue an enumeration from a checkpoint written by checkpoint.save_checkpoint()
+
+    :param dirname: directory of the checkpoint
+    :return: the same values as initiation(), the state is the one after the last saved round
+    """
+    return cp.load_checkpoint(dirname)
+
+
+def expand_mono(species, specieslist, speciesidmap, reactionlist, kinetics, diskcache=None):
+    """
+    mono-molecule reactions of a species, looked up in the reaction cache and then in the on-disk cache
+    if there is one
+
+    :param diskcache: an EnumerationCache object or None
+    :return: specieslist, speciesidmap, reactionlist
+    """
+    if diskcache is None:
+        return se.mono(species, specieslist, speciesidmap, reactionlist, kinetics)
+
+    key = se.reactioncache.get_key(species)
+    cached = se.reactioncache.get(key)
+    if cached is not None:
+        return se.apply_cached_reactions([species], cached, specieslist, speciesidmap, reactionlist, kinetics)
+
+    start = len(reactionlist)
+    cached = diskcache.get(key)
+    if cached is not None:
+        specieslist, speciesidmap, reactionlist = \
+            se.apply_cached_reactions([species], cached, specieslist, speciesidmap, reactionlist, kinetics)
+        se.reactioncache.put(key, reactionlist[start:])
+        return specieslist, speciesidmap, reactionlist
 
-    return (specieslist, speciesidmap, reactionlist, kinetics, indexlist, cursor, visited), initnames, concentrations, outdir, simupara, initlen
+    specieslist, speciesidmap, reactionlist = se.mono(species, specieslist, speciesidmap, reactionlist, kinetics)
+    diskcache.put(key, reactionlist[start:])
+    return specieslist, speciesidmap, reactionlist
 
 
-def one_iteration(specieslist, speciesidmap, reactionlist, kinetics, indexlist, cursor, visited):
-    indexlist += [i for i in range(cursor, len(specieslist))]
-    oldlen = len(visited)
+def expand_bi(speciescomb, specieslist, speciesidmap, reactionlist, kinetics, diskcache=None):
+    """
+    bi-molecule reactions of a species pair, looked up in the reaction cache and then in the on-disk cache
+    if there is one
+
+    :param diskcache: an EnumerationCache object or None
+    :return: specieslist, speciesidmap, reactionlist
+    """
+    reactants = [specieslist[speciescomb[0]], specieslist[speciescomb[1]]]
+    # pairs rejected by the pre-filter have no reactions, they are neither looked up nor stored
+    if not se.can_bind(*reactants):
+        return specieslist, speciesidmap, reactionlist
+    if diskcache is None:
+        return se.bi(speciescomb, specieslist, speciesidmap, reactionlist, kinetics)
+
+    key = se.reactioncache.get_key(*reactants)
+    cached = se.reactioncache.get(key)
+    if cached is not None:
+        return se.apply_cached_reactions(reactants, cached, specieslist, speciesidmap, reactionlist, kinetics)
+
+    start = len(reactionlist)
+    cached = diskcache.get(key)
+    if cached is not None:
+        specieslist, speciesidmap, reactionlist = \
+            se.apply_cached_reactions(reactants, cached, specieslist, speciesidmap, reactionlist, kinetics)
+        se.reactioncache.put(key, reactionlist[start:])
+        return specieslist, speciesidmap, reactionlist
+
+    specieslist, speciesidmap, reactionlist = se.bi(speciescomb, specieslist, speciesidmap, reactionlist, kinetics)
+    diskcache.put(key, reactionlist[start:])
+    return specieslist, speciesidmap, reactionlist
+
 
-    for i in range(cursor, oldlen):
-        specieslist, speciesidmap, reactionlist = se.mono(specieslist[i],
-                                                          specieslist,
-                                                          speciesidmap,
-                                                          reactionlist,
-                                                          kinetics)
-        visited[i] = True
+def expand_parallel(tasks, specieslist, speciesidmap, reactionlist, kinetics, pool, diskcache=None, processes=None):
+    """
+    expand independent species (mono) or species pairs (bi) in a process pool. Workers only return
+    the reactions they found, the results are merged in the order of tasks, so species ids are the
+    same as in a sequential run.
+
+    :param tasks: list of reactant positions in specieslist, [i] for mono and [i, j] for bi
+    :param pool: a multiprocessing Pool object
+    :param diskcache: an EnumerationCache object or None
+    :param processes: number of worker processes of the pool, None if it has one per CPU
+    :return: specieslist, speciesidmap, reactionlist
+    """
+    reactants = [[specieslist[i] for i in t] for t in tasks]
+    reactants = [r for r in reactants if len(r) == 1 or se.can_bind(r[0], r[1])]
+    keys = [se.reactioncache.get_key(*r) for r in reactants]
+    results = [None for _ in reactants]
+    todo = []
+
+    for k in range(0, len(reactants)):
+        results[k] = se.reactioncache.get(keys[k])
+        if results[k] is None and diskcache is not None:
+            results[k] = diskcache.get(keys[k])
+        if results[k] is None:
+            todo.append(k)
 
-    newlen = len(specieslist)
+    if len(todo) != 0:
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        chunksize = len(todo) // (processes * 4) + 1
+        found = pool.starmap(se.explore, [(reactants[k], kinetics) for k in todo], chunksize)
+        for k, reactions in zip(todo, found):
+            se.reactioncache.put(keys[k], reactions)
+            if diskcache is not None:
+                diskcache.put(keys[k], reactions)
+            results[k] = [(r.rule, r.products) for r in reactions]
 
-    comb = util.get_combinations(oldlen, newlen, cursor, indexlist)
+    for k in range(0, len(reactants)):
+        specieslist, speciesidmap, reactionlist = \
+            se.apply_cached_reactions(reactants[k], results[k], specieslist, speciesidmap, reactionlist, kinetics)
+    return specieslist, speciesidmap, reactionlist
 
-    for i in comb:
-        specieslist, speciesidmap, reactionlist = se.bi(i,
-                                                        specieslist,
-                                                        speciesidmap,
-                                                        reactionlist,
-                                                        kinetics)
 
-    if oldlen != len(specieslist):
-        cursor = oldlen
+def expand_tasks(tasks, specieslist, speciesidmap, reactionlist, kinetics, diskcache=None, pool=None, budget=None,
+                 processes=None):
+    """
+    expand species (mono) or species pairs (bi) in order until a budget is used up
+
+    :param tasks: list of reactant positions in specieslist, [i] for mono and (i, j) for bi
+    :param budget: a Budget object or None
+    :param processes: number of worker processes of the pool, None if it has one per CPU
+    :return: specieslist, speciesidmap, reactionlist and the number of tasks expanded
+    """
+    if pool is not None:
+        # the budget is checked between batches
+        batch = max(len(tasks), 1) if budget is None else BUDGET_BATCH
+        for start in range(0, len(tasks), batch):
+            if budget is not None and budget.exceeded(specieslist, reactionlist):
+                return specieslist, speciesidmap, reactionlist, start
+            specieslist, speciesidmap, reactionlist = expand_parallel([list(t) for t in tasks[start:start + batch]],
+                                                                      specieslist, speciesidmap, reactionlist,
+                                                                      kinetics, pool, diskcache, processes)
+        return specieslist, speciesidmap, reactionlist, len(tasks)
+
+    for k in range(0, len(tasks)):
+        if budget is not None and budget.exceeded(specieslist, reactionlist):
+            return specieslist, speciesidmap, reactionlist, k
+        if len(tasks[k]) == 1:
+            specieslist, speciesidmap, reactionlist = expand_mono(specieslist[tasks[k][0]], specieslist,
+                                                                  speciesidmap, reactionlist, kinetics, diskcache)
+        else:
+            specieslist, speciesidmap, reactionlist = expand_bi(tasks[k], specieslist, speciesidmap, reactionlist,
+                                                                kinetics, diskcache)
+    return specieslist, speciesidmap, reactionlist, len(tasks)
+
+
+def one_iteration(specieslist, speciesidmap, reactionlist, kinetics, worklist, diskcache=None, pool=None,
+                  budget=None, processes=None):
+    """
+    expand one round of the worklist: every species in the frontier goes through the mono-molecule
+    reactions, then every species pair that has not been tried yet goes through the bi-molecule reactions
+
+    :param diskcache: an EnumerationCache object to reuse reactions found in earlier runs, or None
+    :param pool: a multiprocessing Pool object to expand the round in parallel, or None
+    :param budget: a Budget object or None. Species with too many strands are not expanded, and once a budget is
+        used up the round stops, the species not fully expanded are flagged in worklist.truncated and the worklist
+        is emptied
+    :param processes: number of worker processes of the pool, None if it has one per CPU
+    :return: the updated enumeration state
+    """
+    oldlen = len(specieslist)
+    frontier = worklist.next_frontier()
+    if budget is not None:
+        worklist.truncated.update(i for i in frontier if budget.too_large(specieslist[i]))
+        frontier = [i for i in frontier if i not in worklist.truncated]
+
+    specieslist, speciesidmap, reactionlist, done = expand_tasks([[i] for i in frontier], specieslist,
+                                                                 speciesidmap, reactionlist, kinetics,
+                                                                 diskcache, pool, budget, processes)
+    if done < len(frontier):
+        # neither the rest of the frontier nor the new species have been paired
+        worklist.truncate(frontier[done:] + list(range(worklist.paired, len(specieslist))))
+        return finish_round(specieslist, speciesidmap, reactionlist, kinetics, worklist, diskcache)
+
+    pairs = worklist.next_pairs(len(specieslist))
+    if budget is not None:
+        worklist.truncated.update(i for i in range(oldlen, len(specieslist)) if budget.too_large(specieslist[i]))
+        pairs = [p for p in pairs if p[0] not in worklist.truncated and p[1] not in worklist.truncated]
+    if trace.enabled(trace.INFO):
+        trace.emit(trace.INFO, 'round', {'round': len(worklist.rounds), 'frontier': len(frontier), 'pairs': len(pairs)})
+
+    specieslist, speciesidmap, reactionlist, done = expand_tasks(pairs, specieslist, speciesidmap, reactionlist,
+                                                                 kinetics, diskcache, pool, budget, processes)
+    if done < len(pairs):
+        # like worklist.paired, a species is flagged if it has not been paired with all species before it
+        worklist.truncate([p[1] for p in pairs[done:]] + list(range(oldlen, len(specieslist))))
     else:
-        cursor = oldlen - 1
-    for i in range(oldlen, len(specieslist)):
-        visited.append(False)
+        worklist.extend(oldlen, len(specieslist))
+
+    return finish_round(specieslist, speciesidmap, reactionlist, kinetics, worklist, diskcache)
 
-    return specieslist, speciesidmap, reactionlist, kinetics, indexlist, cursor, visited
+
+def finish_round(specieslist, speciesidmap, reactionlist, kinetics, worklist, diskcache):
+    if diskcache is not None:
+        diskcache.flush()
+    if profiler.enabled:
+        profiler.end_round(len(worklist.rounds))
+
+    return specieslist, speciesidmap, reactionlist, kinetics, worklist
 
 
 def post_enumeration(specieslist, reactionlist):
@@ -81,6 +253,15 @@ def post_enumeration(specieslist, reactionlist):
 
 
 def simulation(specieslist, reactionlist, initlen, initnames, concentrations, outdir, simupara, simumode):
+    if simumode == 'ode' or simumode == 'ssa':
+        # native simulation, no PySB model is built
+        network = sim.Network(specieslist, reactionlist, initlen, initnames, concentrations)
+        if network.get_reactionnum() == 0:
+            return
+        if simumode == 'ode':
+            return sim.simulate_ode(network, time=simupara[0], steps=simupara[1])
+        return sim.simulate_ssa(network, time=simupara[0], steps=simupara[1])
+
     md = gp.generate_model(specieslist, reactionlist, initlen, initnames, concentrations)
 
     if len(md.rules) != 0:
@@ -99,6 +280,42 @@ def simulation(specieslist, reactionlist, initlen, initnames, concentrations, ou
     return x, y, obs
 
 
+def ensemble_simulation(specieslist, reactionlist, initlen, initnames, concentrations, simupara, runs,
+                        processes=None, seed=None):
+    """
+    run an ensemble of native stochastic simulations in a process pool
+
+    :param runs: number of trajectories
+    :param processes: number of worker processes, None for one per CPU
+    :param seed: seed of the ensemble
+    :return: time points, mean, variance and observables, None if there is no reaction
+    """
+    network = sim.Network(specieslist, reactionlist, initlen, initnames, concentrations)
+    if network.get_reactionnum() == 0:
+        return
+    return sim.simulate_ensemble(network, runs, time=simupara[0], steps=simupara[1], processes=processes, seed=seed)
+
+
+def sweep_simulation(specieslist, reactionlist, initlen, initnames, concentrations, simupara, parametersets,
+                     simumode='ode', processes=None, seed=None):
+    """
+    simulate one enumerated network for every parameter set in a process pool
+
+    :param parametersets: list of dictionaries mapping rate names or initial species names to values,
+        see simulator.get_grid
+    :param simumode: 'ode' or 'ssa'
+    :param processes: number of worker processes, None for one per CPU
+    :param seed: seed of the 'ssa' runs
+    :return: time points, amounts (parameter sets x time points x species) and observables, None if there is no
+        reaction
+    """
+    network = sim.Network(specieslist, reactionlist, initlen, initnames, concentrations)
+    if network.get_reactionnum() == 0:
+        return
+    return sim.sweep(network, parametersets, simumode, time=simupara[0], steps=simupara[1], processes=processes,
+                     seed=seed)
+
+
 def entry(filedir):
     """
     For debugging use.
@@ -106,7 +323,7 @@ def entry(filedir):
     :return:
     """
     info, initnames, concentrations, outdir, simupara, initlen = initiation(filedir)
-    while not info[6][info[5]]:
+    while not info[4].empty():
         info = one_iteration(*info)
     simulation(info[0], info[2], initlen, initnames, concentrations, outdir, simupara, 'bng')
 
@@ -176,7 +176,7 @@ def initialize(filedir):
         species = sp.Species(strandgraph.V, colorset, colormap, strandgraph)
         species.set_id(i + 1)
 
-        speciesidmap.put(species.id, species.canonicalform)
+        speciesidmap.put(species.id, species.key)
         specieslist.append(species)
 
     # error handling
@@ -210,7 +210,7 @@ def initialize(filedir):
         species = sp.Species(i, sub.colorset, sub.colormap, strandgraph)
         species.set_id(cnt)
 
-        speciesidmap.put(species.id, species.canonicalform)
+        speciesidmap.put(species.id, species.key)
 
         specieslist.append(species)
     '''
@@ -125,7 +125,7 @@ def initialize(text):
         species = sp.Species(strandgraph.V, colorset, colormap, strandgraph)
         species.set_id(i + 1)
 
-        speciesidmap.put(species.id, species.canonicalform)
+        speciesidmap.put(species.id, species.key)
         specieslist.append(species)
 
     # error handling
@@ -159,7 +159,7 @@ def initialize(text):
         species = sp.Species(i, sub.colorset, sub.colormap, strandgraph)
         species.set_id(cnt)
 
-        speciesidmap.put(species.id, species.canonicalform)
+        speciesidmap.put(species.id, species.key)
 
         specieslist.append(species)
     '''
@@ -0,0 +1,214 @@
+"""
+Binary export of an enumerated network. The network is written to a directory of .npy arrays and a small
+JSON header, every array can be memory-mapped, and NetworkFile rebuilds Species and Reaction objects only
+when they are accessed.
+
+Layout (CSR style, ptr arrays hold the offsets of every row):
+
+- species: ids, keys (16 bytes each) and strandptr
+- strands: node (the parsing sequence), color and domainptr
+- domains: name (index into the domain table of the header), flags (1 toehold, 2 complementary) and bond
+  (bond number, -1 if not bonded)
+- reactions: rule (index into the rule table of the header), rate, reactantptr, reactants, productptr and
+  products (species ids)
+"""
+from collections.abc import Sequence
+from src.species import species as sp
+from src.strand import strand as sta
+from src.reaction import reaction as ra
+import json
+import numpy as np
+import os
+
+VERSION = 1
+'''version of the layout'''
+
+ARRAYS = ['species_ids', 'species_keys', 'species_strandptr',
+          'strand_node', 'strand_color', 'strand_domainptr',
+          'domain_name', 'domain_flags', 'domain_bond',
+          'reaction_rule', 'reaction_rate', 'reaction_reactantptr', 'reaction_reactants',
+          'reaction_productptr', 'reaction_products']
+'''arrays of the layout, stored as <name>.npy'''
+
+
+def write_network(dirname, specieslist, reactionlist):
+    """
+    export the network
+
+    :param dirname: directory to write the files to, created if needed
+    :param specieslist: list of species, the strands of every species must be constructed
+    :param reactionlist: list of reactions
+    """
+    if not os.path.exists(dirname):
+        os.makedirs(dirname)
+
+    domaintable = {}
+    ruletable = {}
+    arrays = {name: [] for name in ARRAYS}
+    arrays['species_strandptr'].append(0)
+    arrays['strand_domainptr'].append(0)
+    arrays['reaction_reactantptr'].append(0)
+    arrays['reaction_productptr'].append(0)
+
+    for species in specieslist:
+        arrays['species_ids'].append(species.id)
+        arrays['species_keys'].append(np.frombuffer(species.key, dtype=np.uint8))
+        for strand, node in zip(species.strands, species.parsingseq):
+            arrays['strand_node'].append(node)
+            arrays['strand_color'].append(strand.color)
+            for domain in strand.domains:
+                arrays['domain_name'].append(domaintable.setdefault(domain.name, len(domaintable)))
+                arrays['domain_flags'].append(int(domain.toehold) | int(domain.comp) << 1)
+                arrays['domain_bond'].append(int(domain.bondname) if domain.bond else -1)
+            arrays['strand_domainptr'].append(len(arrays['domain_name']))
+        arrays['species_strandptr'].append(len(arrays['strand_node']))
+
+    for reaction in reactionlist:
+        arrays['reaction_rule'].append(ruletable.setdefault(reaction.rule, len(ruletable)))
+        arrays['reaction_rate'].append(reaction.rate)
+        arrays['reaction_reactants'] += [s.id for s in reaction.reactants]
+        arrays['reaction_reactantptr'].append(len(arrays['reaction_reactants']))
+        arrays['reaction_products'] += [s.id for s in reaction.products]
+        arrays['reaction_productptr'].append(len(arrays['reaction_products']))
+
+    dtypes = {'species_keys': np.uint8, 'domain_flags': np.uint8, 'reaction_rule': np.uint8,
+              'reaction_rate': np.float64, 'species_strandptr': np.int64, 'strand_domainptr': np.int64,
+              'reaction_reactantptr': np.int64, 'reaction_productptr': np.int64}
+    for name in ARRAYS:
+        array = np.array(arrays[name], dtype=dtypes.get(name, np.int32))
+        if name == 'species_keys':
+            array = array.reshape(-1, 16)
+        np.save(os.path.join(dirname, name + '.npy'), array)
+
+    with open(os.path.join(dirname, 'network.json'), 'w') as fp:
+        json.dump({'version': VERSION, 'domains': list(domaintable), 'rules': list(ruletable),
+                   'speciesnum': len(specieslist), 'reactionnum': len(reactionlist)}, fp)
+
+
+class LazyList(Sequence):
+    """
+    Read-only list whose items are built by a function on first access
+    """
+
+    get = None
+    '''function building the item at a position'''
+
+    length = 0
+    '''number of items'''
+
+    def __init__(self, get, length):
+        self.get = get
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.get(j) for j in range(*i.indices(self.length))]
+        if i < 0:
+            i += self.length
+        if not 0 <= i < self.length:
+            raise IndexError('index out of range')
+        return self.get(i)
+
+
+class NetworkFile:
+    """
+    Network exported by write_network(). The arrays are memory-mapped, species and reactions are rebuilt on
+    first access and kept, so reactions share their species objects.
+    """
+
+    dirname = ''
+    '''directory of the files'''
+
+    domains = []
+    '''domain table, domain names by index'''
+
+    rules = []
+    '''rule table, rule names by index'''
+
+    arrays = {}
+    '''array name mapped to the (memory-mapped) array'''
+
+    speciesmap = {}
+    '''species id mapped to its position in the species arrays'''
+
+    species = {}
+    '''species built so far by position'''
+
+    reactions = {}
+    '''reactions built so far by position'''
+
+    specieslist = None
+    '''LazyList of the species'''
+
+    reactionlist = None
+    '''LazyList of the reactions'''
+
+    def __init__(self, dirname, mmap=True):
+        """
+        :param dirname: directory written by write_network()
+        :param mmap: memory-map the arrays instead of reading them into memory
+        """
+        self.dirname = dirname
+        with open(os.path.join(dirname, 'network.json')) as fp:
+            header = json.load(fp)
+        if header['version'] != VERSION:
+            raise ValueError('unsupported network file version ' + str(header['version']))
+        self.domains = header['domains']
+        self.rules = header['rules']
+        self.arrays = {name: np.load(os.path.join(dirname, name + '.npy'), mmap_mode='r' if mmap else None)
+                       for name in ARRAYS}
+        self.speciesmap = {int(sid): i for i, sid in enumerate(self.arrays['species_ids'])}
+        self.species = {}
+        self.reactions = {}
+        self.specieslist = LazyList(self.get_species, header['speciesnum'])
+        self.reactionlist = LazyList(self.get_reaction, header['reactionnum'])
+
+    def get_species(self, i):
+        """
+        :param i: position of the species
+        :return: Species object with its strands constructed
+        """
+        if i in self.species:
+            return self.species[i]
+        a = self.arrays
+        strands = []
+        parsingseq = []
+        colormap = {}
+        for k in range(a['species_strandptr'][i], a['species_strandptr'][i + 1]):
+            strand = sta.Strand()
+            for d in range(a['strand_domainptr'][k], a['strand_domainptr'][k + 1]):
+                flags = int(a['domain_flags'][d])
+                bond = int(a['domain_bond'][d])
+                strand.add_domain(sta.Domain(self.domains[a['domain_name'][d]], bool(flags & 1),
+                                             bool(flags & 2), bond != -1, str(bond) if bond != -1 else ''))
+            node = int(a['strand_node'][k])
+            strand.add_color(int(a['strand_color'][k]))
+            strands.append(strand)
+            parsingseq.append(node)
+            colormap.setdefault(strand.color, set()).add(node)
+
+        species = sp.Species.from_strands(strands, parsingseq, colormap, bytes(a['species_keys'][i]))
+        species.set_id(int(a['species_ids'][i]))
+        self.species[i] = species
+        return species
+
+    def get_reaction(self, j):
+        """
+        :param j: position of the reaction
+        :return: Reaction object
+        """
+        if j in self.reactions:
+            return self.reactions[j]
+        a = self.arrays
+        reactants = [self.get_species(self.speciesmap[int(s)])
+                     for s in a['reaction_reactants'][a['reaction_reactantptr'][j]:a['reaction_reactantptr'][j + 1]]]
+        products = [self.get_species(self.speciesmap[int(s)])
+                    for s in a['reaction_products'][a['reaction_productptr'][j]:a['reaction_productptr'][j + 1]]]
+        reaction = ra.Reaction(reactants, products)
+        reaction.add_rule(self.rules[a['reaction_rule'][j]])
+        reaction.add_rate(float(a['reaction_rate'][j]))
+        self.reactions[j] = reaction
+        return reaction
@@ -1,5 +1,8 @@
-import networkx as nx
+import io
+import os
+import shutil
 import numpy as np
+from scipy import sparse
 from pysb.simulator import ScipyOdeSimulator
 import matplotlib.pyplot as plt
 from pysb.bng import *
@@ -15,32 +18,64 @@ class Canvas(FigureCanvasQTAgg):
 
 def generate_incidence_matrix(specieslist, reactionlist):
     """
+    incidence matrix of the species graph, built as a sparse matrix. Every edge from a reactant to a product of
+    a reaction is a column with 1 in the row of the reactant and -1 in the row of the product; the column of an
+    edge from a species to itself is empty, as in the incidence matrix of networkx.
 
     :param specieslist: list of species
     :param reactionlist: list of reactions
-    :return:
+    :return: species ids (row labels), edges (column labels) as [reactant id, product id], and the incidence matrix
+        as a scipy.sparse.coo_matrix
     """
     nodes = [i.id for i in specieslist]
+    rowmap = {nodes[i]: i for i in range(0, len(nodes))}
+    edgemap = {}
     edges = []
+    rows = []
+    cols = []
+    vals = []
 
     for i in reactionlist:
         for j in i.reactants:
             for k in i.products:
+                if (j.id, k.id) in edgemap:
+                    continue
+                edgemap[(j.id, k.id)] = len(edges)
+                # an edge from a species to itself is an empty column
+                if j.id != k.id:
+                    rows += [rowmap[j.id], rowmap[k.id]]
+                    cols += [len(edges), len(edges)]
+                    vals += [1, -1]
                 edges.append([j.id, k.id])
 
-    G = nx.DiGraph()
-    G.add_nodes_from(nodes)
-    G.add_edges_from(edges)
-    matrix = -nx.incidence_matrix(G, oriented=True)
+    matrix = sparse.coo_matrix((vals, (rows, cols)), shape=(len(nodes), len(edges)), dtype=np.int8)
 
     return nodes, edges, matrix
 
 
-def visualize_simulation_results(x, y, obs, filedir='../output', option='bng', colormap='Paired'):
+def read_incidence_matrix(text):
     """
+    read the incidence matrix back from the text written by generate_text
 
+    :param text: content of output.txt
+    :return: edges (column labels) and the incidence matrix as a scipy.sparse.coo_matrix, rows are indexed by
+        species id - 1
+    """
+    lines = text[text.index('-----Incidence Matrix-----\n'):].split('\n')
+    rownum, colnum, nnz = [int(i) for i in lines[1].split()]
+    edges = [[int(i) for i in label.split(',')] for label in lines[2].split()]
+    triplets = np.array([line.split() for line in lines[3:3 + nnz]], dtype=int).reshape(-1, 3)
+
+    return edges, sparse.coo_matrix((triplets[:, 2], (triplets[:, 0] - 1, triplets[:, 1] - 1)),
+                                    shape=(rownum, colnum), dtype=np.int8)
+
+
+def visualize_simulation_results(x, y, obs, filedir='../output', option='bng', colormap='Paired', var=None):
+    """
+
+    :param var: variance of y for ensemble simulations, drawn as a band of one standard deviation
     :param colormap: colormap setting
-    :param option: choose visualization for bng or scipy simulation
+    :param option: choose visualization for bng, scipy or native ode and ssa simulation
     :param obs: observables
     :param x: values on x axis
     :param y: values on y axis
@@ -54,8 +89,11 @@ def visualize_simulation_results(x, y, obs, filedir='../output', option='bng', c
 
     for i in range(0, obslen):
         label = obs[i].name[3:]
-        if option == 'bng':
+        if option in ('bng', 'ode', 'ssa'):
             plt.plot(x, y[:, i], label=label, c=cmap(i))
+            if var is not None:
+                std = np.sqrt(var[:, i])
+                plt.fill_between(x, y[:, i] - std, y[:, i] + std, color=cmap(i), alpha=0.2, linewidth=0)
         elif option == 'scipy':
             plt.plot(x, y[obs[i].name], label=label, c=cmap(i))
 
@@ -74,51 +112,141 @@ def output_network_txt(specieslist, reactionlist, filedir='output'):
     :param reactionlist: list of reactions
     :param filedir: file directory to write the txt file
     """
+    with open(filedir + '/output.txt', 'w') as fp:
+        write_text(fp, specieslist, reactionlist)
 
-    file = open(filedir + '/output.txt', 'w+')
-    '''
-    file.write('-----Species-----\n')
-    for i in specieslist:
-        file.write(i.generate_output())
-        file.write('\n')
 
-    file.write('-----Reactions-----\n')
-    for i in reactionlist:
-        file.write(i.generate_output())
-        file.write('\n')
+def generate_text(specieslist, reactionlist):
+    """
+    :param specieslist: list of species
+    :param reactionlist: list of reactions
+    :return: the text written by write_text
+    """
+    fp = io.StringIO()
+    write_text(fp, specieslist, reactionlist)
+    return fp.getvalue()
 
-    file.write('-----Incidence Matrix-----\n')
-    rowlabels, collabels, incidencematrix = generate_incidence_matrix(specieslist, reactionlist)
-    incidencematrix = incidencematrix.todense()
 
-    print(*collabels, file=file)
-    np.set_printoptions(linewidth=90)
+def write_text(fp, specieslist, reactionlist, truncated=None):
+    """
+    write the text of the reaction network
 
-    for rowlabel, row in zip(rowlabels, incidencematrix):
-        print('%s %s' % ('%03s' % rowlabel, ' '.join('%s' % i for i in row)), file=file)
-    '''
-    file.write(generate_text(specieslist, reactionlist))
-    file.close()
+    :param fp: file object
+    :param specieslist: list of species
+    :param reactionlist: list of reactions
+    :param truncated: positions in specieslist of the species not fully expanded because of a budget
+    """
+    fp.write('-----Species-----\n')
+    write_species(fp, specieslist)
+    fp.write('-----Reactions-----\n')
+    write_reactions(fp, reactionlist)
+    write_truncated(fp, specieslist, truncated)
+    write_incidence_matrix(fp, specieslist, reactionlist)
 
 
-def generate_text(specieslist, reactionlist):
-    text = '-----Species-----\n'
-    for i in specieslist:
-        text += i.generate_output() + '\n'
+def write_species(fp, specieslist):
+    fp.writelines(i.generate_output() + '\n' for i in specieslist)
+
+
+def write_reactions(fp, reactionlist):
+    fp.writelines(i.generate_output() + '\n' for i in reactionlist)
+
+
+def write_truncated(fp, specieslist, truncated):
+    """
+    write the ids of the truncated species, nothing if there are none
+
+    :param fp: file object
+    :param specieslist: list of species
+    :param truncated: positions in specieslist of the truncated species, or None
+    """
+    if not truncated:
+        return
+    fp.write('-----Truncated Species-----\n')
+    fp.write(' '.join([str(specieslist[i].id) for i in sorted(truncated)]) + '\n\n')
 
-    text += '-----Reactions-----\n'
-    for i in reactionlist:
-        text += i.generate_output() + '\n'
 
-    text += '-----Incidence Matrix-----\n'
+def write_incidence_matrix(fp, specieslist, reactionlist):
+    """
+    write the incidence matrix as its size (species, edges and nonzeros), a line of edge labels
+    'reactant,product' and one 'species edge value' triplet per nonzero, edges counted from 1
+
+    :param fp: file object
+    :param specieslist: list of species
+    :param reactionlist: list of reactions
+    """
     rowlabels, collabels, incidencematrix = generate_incidence_matrix(specieslist, reactionlist)
-    incidencematrix = incidencematrix.todense()
 
-    text += ' '.join([str(elem) for elem in collabels]) + '\n'
-    for rowlabel, row in zip(rowlabels, incidencematrix):
-        text += '%s %s' % ('%03s' % rowlabel, ' '.join('%s' % i for i in row)) + '\n'
+    fp.write('-----Incidence Matrix-----\n')
+    fp.write('%d %d %d\n' % (len(rowlabels), len(collabels), incidencematrix.nnz))
+    fp.write(' '.join(['%d,%d' % (j, k) for j, k in collabels]) + '\n')
+    fp.writelines('%d %d %d\n' % (rowlabels[r], c + 1, v)
+                  for r, c, v in zip(incidencematrix.row.tolist(), incidencematrix.col.tolist(),
+                                     incidencematrix.data.tolist()))
+
+
+class NetworkWriter:
+    """
+    Writer of output.txt during the enumeration. The species and reactions found in every round are appended
+    to the file (reactions go to output.txt.reactions until close()), so large runs never hold the whole text
+    and the files keep the partial network if the run is stopped.
+    """
 
-    return text
+    filedir = ''
+    '''path of output.txt'''
+
+    speciesfile = None
+    '''output.txt, written up to the reaction section'''
+
+    reactionfile = None
+    '''reactions written so far'''
+
+    speciesnum = 0
+    '''number of species written'''
+
+    reactionnum = 0
+    '''number of reactions written'''
+
+    def __init__(self, filedir='output'):
+        self.filedir = filedir + '/output.txt'
+        self.speciesfile = open(self.filedir, 'w')
+        self.reactionfile = open(self.filedir + '.reactions', 'w+')
+        self.speciesfile.write('-----Species-----\n')
+        self.speciesnum = 0
+        self.reactionnum = 0
+
+    def update(self, specieslist, reactionlist):
+        """
+        write the species and reactions added to the lists since the last update
+
+        :param specieslist: list of species
+        :param reactionlist: list of reactions
+        """
+        write_species(self.speciesfile, specieslist[self.speciesnum:])
+        write_reactions(self.reactionfile, reactionlist[self.reactionnum:])
+        self.speciesnum = len(specieslist)
+        self.reactionnum = len(reactionlist)
+        self.speciesfile.flush()
+        self.reactionfile.flush()
+
+    def close(self, specieslist, reactionlist, truncated=None):
+        """
+        write the rest of the network, the reactions, the truncated species and the incidence matrix, and close
+        the files
+
+        :param specieslist: list of species
+        :param reactionlist: list of reactions
+        :param truncated: positions in specieslist of the species not fully expanded because of a budget
+        """
+        self.update(specieslist, reactionlist)
+        self.speciesfile.write('-----Reactions-----\n')
+        self.reactionfile.seek(0)
+        shutil.copyfileobj(self.reactionfile, self.speciesfile)
+        self.reactionfile.close()
+        os.remove(self.filedir + '.reactions')
+        write_truncated(self.speciesfile, specieslist, truncated)
+        write_incidence_matrix(self.speciesfile, specieslist, reactionlist)
+        self.speciesfile.close()
 
 
 def simulate_bng(model, time=1000, steps=100, bngnetwork=False):
@@ -0,0 +1,499 @@
+"""
+Native simulation of the reaction network. Every DSD reaction is a mass-action reaction with one or two
+reactants, so the network is compiled straight from reactionlist into index and stoichiometry arrays,
+without building a PySB model.
+"""
+from collections import namedtuple
+import copy
+import functools
+import itertools
+import multiprocessing
+import numpy as np
+from scipy import sparse
+from scipy.integrate import solve_ivp
+from src.util import cexception
+
+Observable = namedtuple('Observable', ['name', 'species'])
+'''observable of one species, named 'obs' + species name like the observables of the PySB model'''
+
+
+class Network:
+    """
+    Reaction network compiled into arrays, species are indexed by id - 1
+    """
+
+    names = []
+    '''species names'''
+
+    initial = None
+    '''initial amount of every species'''
+
+    reactant1 = None
+    '''index of the first reactant of every reaction'''
+
+    reactant2 = None
+    '''index of the second reactant of every reaction, the number of species for mono-molecule reactions'''
+
+    rates = None
+    '''rate constant of every reaction, halved for reactions of two identical reactants'''
+
+    rules = None
+    '''rule of every reaction, the name of its rate constant in kinetics'''
+
+    initialindex = {}
+    '''name of every initial species mapped to its index'''
+
+    stoichiometry = None
+    '''sparse species x reactions matrix of the net change of every reaction'''
+
+    bi = None
+    '''boolean array marking the bi-molecule reactions'''
+
+    jacrows = None
+    '''reaction of every nonzero in the derivatives of the fluxes'''
+
+    jaccols = None
+    '''species of every nonzero in the derivatives of the fluxes'''
+
+    def __init__(self, specieslist, reactionlist, initlen, initnames, concentrations):
+        speciesnum = len(specieslist)
+        reactionnum = len(reactionlist)
+
+        self.names = [initnames[i.id - 1] if i.id <= initlen else 'sp_' + str(i.id) for i in specieslist]
+        self.initial = np.zeros(speciesnum)
+        self.initial[0:initlen] = concentrations[0:initlen]
+        self.initialindex = {self.names[i]: i for i in range(0, initlen)}
+
+        self.reactant1 = np.empty(reactionnum, dtype=np.intp)
+        self.reactant2 = np.full(reactionnum, speciesnum, dtype=np.intp)
+        self.rates = np.empty(reactionnum)
+        self.rules = np.array([r.rule for r in reactionlist], dtype=object)
+        rows = []
+        cols = []
+        vals = []
+
+        for j in range(0, reactionnum):
+            reaction = reactionlist[j]
+            self.reactant1[j] = reaction.reactants[0].id - 1
+            self.rates[j] = reaction.rate
+            if len(reaction.reactants) == 2:
+                self.reactant2[j] = reaction.reactants[1].id - 1
+                # symmetry factor of BNG for reactions like A + A -> B
+                if self.reactant1[j] == self.reactant2[j]:
+                    self.rates[j] /= 2.
+            for s in reaction.reactants:
+                rows.append(s.id - 1)
+                cols.append(j)
+                vals.append(-1.)
+            for s in reaction.products:
+                rows.append(s.id - 1)
+                cols.append(j)
+                vals.append(1.)
+
+        # duplicate entries are summed, reactions like A -> A + B only keep the net change
+        self.stoichiometry = sparse.csr_matrix((vals, (rows, cols)), shape=(speciesnum, reactionnum))
+
+        bi = self.reactant2 != speciesnum
+        self.jacrows = np.concatenate((np.arange(reactionnum), np.nonzero(bi)[0]))
+        self.jaccols = np.concatenate((self.reactant1, self.reactant2[bi]))
+        self.bi = bi
+
+    def get_speciesnum(self):
+        return len(self.names)
+
+    def get_reactionnum(self):
+        return len(self.rates)
+
+    def with_parameters(self, parameters):
+        """
+        copy of the network with other rate constants or initial amounts, the arrays describing the structure
+        of the network are shared
+
+        :param parameters: dictionary mapping rate names (RB, RU, R3, R4, RB_2) or initial species names to values
+        :return: a Network object
+        """
+        network = copy.copy(self)
+        network.rates = self.rates.copy()
+        network.initial = self.initial.copy()
+        for name, value in parameters.items():
+            if name in self.initialindex:
+                network.initial[self.initialindex[name]] = value
+                continue
+            mask = self.rules == name
+            if not mask.any() and name not in ('RB', 'RU', 'R3', 'R4', 'RB_2'):
+                raise cexception.KineticsError('no rate constant or initial species named ' + str(name))
+            # symmetry factor of BNG for reactions like A + A -> B
+            network.rates[mask] = value / np.where(self.reactant1[mask] == self.reactant2[mask], 2., 1.)
+        return network
+
+    def get_observables(self):
+        """
+        :return: list of Observable, one per species
+        """
+        return [Observable('obs' + self.names[i], i) for i in range(0, len(self.names))]
+
+    def get_fluxes(self, x):
+        """
+        mass-action flux of every reaction
+
+        :param x: amount of every species
+        :return: array of fluxes
+        """
+        xe = np.append(x, 1.)
+        return self.rates * xe[self.reactant1] * xe[self.reactant2]
+
+    def get_derivatives(self, t, x):
+        """
+        right hand side of the ODE system
+
+        :param t: time, unused since the system is autonomous
+        :param x: amount of every species
+        :return: dx/dt
+        """
+        return self.stoichiometry.dot(self.get_fluxes(x))
+
+    def get_jacobian(self, t, x):
+        """
+        analytic Jacobian of the ODE system, stoichiometry times the derivatives of the fluxes
+
+        :param t: time, unused since the system is autonomous
+        :param x: amount of every species
+        :return: sparse Jacobian matrix
+        """
+        xe = np.append(x, 1.)
+        vals = np.concatenate((self.rates * xe[self.reactant2],
+                               self.rates[self.bi] * xe[self.reactant1[self.bi]]))
+        dflux = sparse.csr_matrix((vals, (self.jacrows, self.jaccols)),
+                                  shape=(self.get_reactionnum(), self.get_speciesnum()))
+        return sparse.csc_matrix(self.stoichiometry.dot(dflux))
+
+
+def simulate_ode(network, time=1000, steps=100, method='BDF'):
+    """
+    integrate the ODE system of the network
+
+    :param network: a Network object
+    :param time: simulation time
+    :param steps: number of time points
+    :param method: integration method of scipy.integrate.solve_ivp, BDF, Radau and LSODA use the Jacobian
+    :return: time points, amounts (time points x species) and observables
+    """
+    t = np.linspace(0, float(time), int(steps))
+    jac = network.get_jacobian
+    if method == 'LSODA':
+        # LSODA only takes dense Jacobians
+        jac = lambda t, x: network.get_jacobian(t, x).toarray()
+    res = solve_ivp(network.get_derivatives, (t[0], t[-1]), network.initial, method=method, t_eval=t, jac=jac)
+    if not res.success:
+        raise RuntimeError('ODE integration failed: ' + res.message)
+    return res.t, res.y.T, network.get_observables()
+
+
+class ReactionQueue:
+    """
+    Indexed binary min-heap of the next firing time of every reaction, the time of any reaction can be
+    changed in O(log M)
+    """
+
+    heap = []
+    '''reaction ids ordered as a binary heap by their firing time'''
+
+    pos = []
+    '''position of every reaction in heap'''
+
+    tau = []
+    '''next firing time of every reaction'''
+
+    def __init__(self, tau):
+        self.tau = list(tau)
+        self.heap = sorted(range(0, len(self.tau)), key=self.tau.__getitem__)
+        self.pos = [0 for _ in self.tau]
+        for i in range(0, len(self.heap)):
+            self.pos[self.heap[i]] = i
+
+    def top(self):
+        """
+        :return: the reaction firing next
+        """
+        return self.heap[0]
+
+    def update(self, j, t):
+        """
+        change the firing time of reaction j and restore the heap order
+
+        :param j: reaction id
+        :param t: new firing time
+        """
+        heap = self.heap
+        pos = self.pos
+        tau = self.tau
+        tau[j] = t
+        i = pos[j]
+        # sift up
+        while i > 0:
+            parent = (i - 1) >> 1
+            p = heap[parent]
+            if t < tau[p]:
+                heap[i] = p
+                pos[p] = i
+                i = parent
+            else:
+                break
+        # sift down
+        n = len(heap)
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                break
+            c = heap[child]
+            if child + 1 < n and tau[heap[child + 1]] < tau[c]:
+                child += 1
+                c = heap[child]
+            if tau[c] < t:
+                heap[i] = c
+                pos[c] = i
+                i = child
+            else:
+                break
+        heap[i] = j
+        pos[j] = i
+
+
+def get_dependencies(network):
+    """
+    dependency graph of the reactions: the reactions whose propensity changes when a reaction fires
+
+    :param network: a Network object
+    :return: list of reaction ids for every reaction
+    """
+    reactionnum = network.get_reactionnum()
+    speciesnum = network.get_speciesnum()
+    bi = np.nonzero(network.bi)[0]
+    # reactions x species, nonzero where the species is a reactant of the reaction
+    consumers = sparse.csr_matrix((np.ones(reactionnum + len(bi)),
+                                   (np.concatenate((np.arange(reactionnum), bi)),
+                                    np.concatenate((network.reactant1, network.reactant2[bi])))),
+                                  shape=(reactionnum, speciesnum))
+    changed = abs(network.stoichiometry).T.tocsr()
+    dep = (changed.dot(consumers.T)).tocsr()
+    return [dep.indices[dep.indptr[j]:dep.indptr[j + 1]].tolist() for j in range(0, reactionnum)]
+
+
+def simulate_ssa(network, time=1000, steps=100, seed=None):
+    """
+    stochastic simulation of the network with the next reaction method of Gibson and Bruck. Only the
+    propensities of the reactions depending on the fired reaction are updated.
+
+    :param network: a Network object
+    :param time: simulation time
+    :param steps: number of time points
+    :param seed: seed of the random number generator
+    :return: time points, amounts (time points x species) and observables
+    """
+    rng = np.random.default_rng(seed)
+    tpoints = np.linspace(0, float(time), int(steps)).tolist()
+    y = np.empty((len(tpoints), network.get_speciesnum()))
+
+    reactionnum = network.get_reactionnum()
+    x = [int(round(i)) for i in network.initial]
+    rates = network.rates.tolist()
+    reactant1 = network.reactant1.tolist()
+    # second reactant, -1 for mono-molecule reactions and -2 for two identical reactants
+    reactant2 = network.reactant2.tolist()
+    bi = network.bi.tolist()
+    for j in range(0, reactionnum):
+        if not bi[j]:
+            reactant2[j] = -1
+        elif reactant2[j] == reactant1[j]:
+            reactant2[j] = -2
+    stoich = network.stoichiometry.tocsc()
+    changes = [list(zip(stoich.indices[stoich.indptr[j]:stoich.indptr[j + 1]].tolist(),
+                        stoich.data[stoich.indptr[j]:stoich.indptr[j + 1]].astype(int).tolist()))
+               for j in range(0, reactionnum)]
+    # the fired reaction itself always draws a new time, it is handled after its dependents
+    dependencies = [[k for k in d if k != j] for j, d in enumerate(get_dependencies(network))]
+
+    def propensity(j):
+        r2 = reactant2[j]
+        if r2 == -1:
+            return rates[j] * x[reactant1[j]]
+        if r2 == -2:
+            return rates[j] * x[reactant1[j]] * (x[reactant1[j]] - 1)
+        return rates[j] * x[reactant1[j]] * x[r2]
+
+    inf = float('inf')
+    a = [propensity(j) for j in range(0, reactionnum)]
+    draws = rng.exponential(size=reactionnum).tolist()
+    queue = ReactionQueue([draws[j] / a[j] if a[j] > 0 else inf for j in range(0, reactionnum)])
+    tau = queue.tau
+    update = queue.update
+
+    # exponential random numbers are drawn in batches
+    draws = []
+    d = 0
+
+    k = 0
+    while k < len(tpoints):
+        if reactionnum != 0:
+            mu = queue.heap[0]
+            t = tau[mu]
+        else:
+            t = inf
+        while k < len(tpoints) and tpoints[k] < t:
+            y[k] = x
+            k += 1
+        if k == len(tpoints):
+            break
+
+        for s, delta in changes[mu]:
+            x[s] += delta
+        for j in dependencies[mu]:
+            anew = propensity(j)
+            aold = a[j]
+            a[j] = anew
+            if anew == aold:
+                continue
+            if anew <= 0:
+                update(j, inf)
+            elif aold <= 0:
+                if d == len(draws):
+                    draws = rng.exponential(size=4096).tolist()
+                    d = 0
+                update(j, t + draws[d] / anew)
+                d += 1
+            else:
+                update(j, t + (aold / anew) * (tau[j] - t))
+        a[mu] = propensity(mu)
+        if a[mu] > 0:
+            if d == len(draws):
+                draws = rng.exponential(size=4096).tolist()
+                d = 0
+            update(mu, t + draws[d] / a[mu])
+            d += 1
+        else:
+            update(mu, inf)
+
+    return np.array(tpoints), y, network.get_observables()
+
+
+worker_network = None
+'''network simulated by the worker processes of simulate_ensemble()'''
+
+
+def init_worker(network):
+    global worker_network
+    worker_network = network
+
+
+def run_trajectory(time, steps, seed):
+    """
+    worker function of simulate_ensemble()
+
+    :return: amounts (time points x species) of one trajectory
+    """
+    return simulate_ssa(worker_network, time, steps, seed)[1]
+
+
+def simulate_ensemble(network, runs=100, time=1000, steps=100, processes=None, seed=None):
+    """
+    run independent stochastic trajectories in a process pool. Mean and variance are accumulated as the
+    trajectories arrive (Welford's algorithm), so only one trajectory per worker is held in memory.
+
+    :param network: a Network object
+    :param runs: number of trajectories
+    :param time: simulation time
+    :param steps: number of time points
+    :param processes: number of worker processes, None for one per CPU, 1 to run in this process
+    :param seed: seed from which an independent seed of every trajectory is spawned
+    :return: time points, mean and variance (time points x species) and observables
+    """
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    seeds = np.random.SeedSequence(seed).spawn(runs)
+    tpoints = np.linspace(0, float(time), int(steps))
+    mean = np.zeros((len(tpoints), network.get_speciesnum()))
+    m2 = np.zeros_like(mean)
+
+    if processes == 1:
+        init_worker(network)
+        trajectories = (run_trajectory(time, steps, s) for s in seeds)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes, initializer=init_worker, initargs=(network,))
+        trajectories = pool.imap(functools.partial(run_trajectory, time, steps), seeds)
+
+    try:
+        n = 0
+        for y in trajectories:
+            n += 1
+            delta = y - mean
+            mean += delta / n
+            m2 += delta * (y - mean)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    var = m2 / (n - 1) if n > 1 else np.zeros_like(mean)
+    return tpoints, mean, var, network.get_observables()
+
+
+def get_grid(values):
+    """
+    all combinations of the given parameter values
+
+    :param values: dictionary mapping parameter names (see Network.with_parameters) to lists of values
+    :return: list of parameter sets, dictionaries mapping every name to one value
+    """
+    names = list(values.keys())
+    return [dict(zip(names, combination)) for combination in itertools.product(*[values[n] for n in names])]
+
+
+def run_parameters(mode, time, steps, task):
+    """
+    worker function of sweep()
+
+    :param task: parameter set and seed of the run
+    :return: amounts (time points x species) of the run
+    """
+    parameters, seed = task
+    network = worker_network.with_parameters(parameters)
+    if mode == 'ode':
+        return simulate_ode(network, time, steps)[1]
+    return simulate_ssa(network, time, steps, seed)[1]
+
+
+def sweep(network, parametersets, mode='ode', time=1000, steps=100, processes=None, seed=None):
+    """
+    simulate the network once per parameter set. Parameters only change the rate constants and initial
+    amounts, so the network is enumerated and compiled once and sent to every worker once.
+
+    :param network: a Network object
+    :param parametersets: list of parameter sets (see Network.with_parameters and get_grid)
+    :param mode: 'ode' or 'ssa'
+    :param time: simulation time
+    :param steps: number of time points
+    :param processes: number of worker processes, None for one per CPU, 1 to run in this process
+    :param seed: seed from which the seed of every 'ssa' run is spawned
+    :return: time points, amounts (parameter sets x time points x species) in the order of parametersets and
+        observables
+    """
+    if mode not in ('ode', 'ssa'):
+        raise ValueError('unknown simulation mode ' + str(mode))
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    tasks = list(zip(parametersets, np.random.SeedSequence(seed).spawn(len(parametersets))))
+    tpoints = np.linspace(0, float(time), int(steps))
+    res = np.empty((len(tasks), len(tpoints), network.get_speciesnum()))
+    run = functools.partial(run_parameters, mode, time, steps)
+
+    if processes == 1:
+        init_worker(network)
+        for i in range(0, len(tasks)):
+            res[i] = run(tasks[i])
+    else:
+        with multiprocessing.Pool(processes, initializer=init_worker, initargs=(network,)) as pool:
+            for i, y in enumerate(pool.imap(run, tasks)):
+                res[i] = y
+
+    return tpoints, res, network.get_observables()
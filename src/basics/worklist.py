@@ -0,0 +1,103 @@
+from collections import deque
+
+
+class Worklist:
+    """
+    Worklist of the enumeration, keeps the species and species pairs that are not expanded yet
+    """
+
+    frontier = None
+    '''species ids (positions in specieslist) waiting for mono-molecule expansion'''
+
+    paired = 0
+    '''number of species that have been paired with all the species before them'''
+
+    rounds = []
+    '''frontier size of every round that has been expanded'''
+
+    truncated = set()
+    '''positions in specieslist of the species that are not fully expanded because of a budget'''
+
+    def __init__(self, speciesnum):
+        self.frontier = deque(range(0, speciesnum))
+        self.paired = 0
+        self.rounds = []
+        self.truncated = set()
+
+    def empty(self):
+        """
+        check if there is nothing left to expand
+
+        :return: True if the enumeration has finished, False otherwise
+        """
+        return len(self.frontier) == 0
+
+    def next_frontier(self):
+        """
+        take out the species of the current round
+
+        :return: list of positions in specieslist
+        """
+        frontier = list(self.frontier)
+        self.frontier.clear()
+        self.rounds.append(len(frontier))
+        return frontier
+
+    def extend(self, start, end):
+        """
+        put newly produced species into the frontier of the next round
+
+        :param start: position of the first new species in specieslist
+        :param end: length of specieslist
+        """
+        self.frontier.extend(range(start, end))
+
+    def next_pairs(self, speciesnum):
+        """
+        take out all species pairs that have not been expanded yet. Each new species is paired with
+        every species before it and with itself, so every unordered pair is produced exactly once.
+
+        :param speciesnum: current length of specieslist
+        :return: list of pairs of positions in specieslist
+        """
+        pairs = []
+        for j in range(self.paired, speciesnum):
+            for i in range(0, j + 1):
+                pairs.append((i, j))
+        self.paired = speciesnum
+        return pairs
+
+    def truncate(self, positions):
+        """
+        flag species as truncated and end the enumeration
+
+        :param positions: positions in specieslist of the species that are not fully expanded
+        """
+        self.truncated.update(positions)
+        self.frontier.clear()
+
+    def to_record(self):
+        """
+        plain representation of the worklist for storing it on disk
+
+        :return: a dictionary of JSON serializable values
+        """
+        return {'frontier': list(self.frontier),
+                'paired': self.paired,
+                'rounds': list(self.rounds),
+                'truncated': sorted(self.truncated)}
+
+    @staticmethod
+    def from_record(record):
+        """
+        rebuild a worklist stored by to_record()
+
+        :param record: a dictionary returned by to_record()
+        :return: a Worklist object
+        """
+        worklist = Worklist(0)
+        worklist.frontier.extend(record['frontier'])
+        worklist.paired = record['paired']
+        worklist.rounds = list(record['rounds'])
+        worklist.truncated = set(record.get('truncated', []))
+        return worklist
@@ -2,19 +2,17 @@ class Reaction:
     """
     Data structure for a reaction in DSD system
     """
-    reactants = []
 
-    products = []
-
-    rule = ''
-    '''the rule this reaction applies'''
-
-    rate = -1
-    '''reaction rate'''
+    __slots__ = {'reactants': 'reactant species',
+                 'products': 'product species',
+                 'rule': 'the rule this reaction applies',
+                 'rate': 'reaction rate'}
 
     def __init__(self, reactants, products):
         self.reactants = reactants
         self.products = products
+        self.rule = ''
+        self.rate = -1
 
     def add_rate(self, rate):
         self.rate = rate
@@ -30,24 +28,5 @@ class Reaction:
         generate string output for output txt file
         :return: string representation of the reaction. e.g. 1 + 2 --> 3 rate=1
         """
-        string = self.rule + ' '
-        rlen = len(self.reactants)
-        plen = len(self.products)
-
-        for i in range(0, rlen):
-            if i != rlen - 1 and rlen != 1:
-                string += str(self.reactants[i].id) + ' + '
-            else:
-                string += str(self.reactants[i].id)
-
-        string += ' --> '
-
-        for i in range(0, plen):
-            if i != plen - 1 and plen != 1:
-                string += str(self.products[i].id) + ' + '
-            else:
-                string += str(self.products[i].id)
-
-        string += ' rate=' + str(self.rate) + '\n'
-
-        return string
+        return self.rule + ' ' + ' + '.join([str(i.id) for i in self.reactants]) + ' --> ' + \
+            ' + '.join([str(i.id) for i in self.products]) + ' rate=' + str(self.rate) + '\n'
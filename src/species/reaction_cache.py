@@ -0,0 +1,87 @@
+from collections import OrderedDict
+import copy
+
+
+class ReactionCache:
+    """
+    Size bounded LRU cache of the reactions a species (or a pair of species) can go through.
+    Rule checking only depends on the strands of the species, so the reactions found once can be
+    reused whenever a species with the same canonical form shows up again, also in another DSD system.
+    """
+
+    maxsize = 10000
+    '''maximum number of entries, 0 disables the cache'''
+
+    entries = None
+    '''keys mapped to a list of (rule name, product species) in the order the reactions were found'''
+
+    hits = 0
+    '''number of successful lookups'''
+
+    misses = 0
+    '''number of failed lookups'''
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def get_key(*species):
+        """
+        build the cache key of one or more species. The colors of the strands are part of the key
+        since they decide the starting vertex of the canonical form of the products
+
+        :param species: Species objects, in the order their strands are merged
+        :return: a hashable key
+        """
+        return tuple((s.key, tuple(strand.color for strand in s.strands)) for s in species)
+
+    def get(self, key):
+        """
+        look up the reactions of a key and mark it as recently used
+
+        :param key: return value of get_key()
+        :return: list of (rule name, product species), None if not cached
+        """
+        if key not in self.entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key, reactions):
+        """
+        store the reactions of a key, evict the least recently used entry if the cache is full
+
+        :param key: return value of get_key()
+        :param reactions: list of Reaction objects found for the key
+        """
+        if self.maxsize <= 0:
+            return
+        self.entries[key] = [(r.rule, list(r.products)) for r in reactions]
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        """
+        drop all entries and counters
+        """
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def copy_product(species):
+        """
+        copy a cached product so that the id of the cached species is never changed
+
+        :param species: a Species object
+        :return: a Species object without id
+        """
+        product = copy.copy(species)
+        product.id = -1
+        return product
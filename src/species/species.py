@@ -1,44 +1,114 @@
 from src.util import util
 from src.basics import lexical_analyzer as lex
-import queue
+from src.strand import strand as sta
+from src.util.traversal_queue import TraversalQueue
+import hashlib
 import operator
 
 
+def get_key(canonical):
+    """
+    compact key of a canonical form, a 128-bit digest that stays the same across processes and runs
+
+    :param canonical: canonical form string
+    :return: bytes
+    """
+    return hashlib.blake2b(canonical.encode(), digest_size=16).digest()
+
+
 class Species:
     """
     Species (DNA Complexes) consists of one or more strands
     """
 
-    id = -1
-    '''species id'''
+    __slots__ = {'id': 'species id',
+                 'colormap': 'map colors to nodes',
+                 'colorset': 'set of colors',
+                 'nodes': 'strand ids in the species',
+                 'key': 'compact canonical key (see get_key()), used for dedup and cache lookups',
+                 '_canonicalform': 'canonical form string while it is needed for constructing the strands, '
+                                   'None afterwards',
+                 'strands': 'strands',
+                 'parsingseq': 'parsing sequence for deriving canonical form',
+                 'signature': 'unbound and unhidden domains as (toeholds, other domains), sets of (name, comp), '
+                              'None until derived'}
+
+    def __init__(self, nodes, colorset, colormap, strandgraph, materialize=True):
+        self.id = -1
+        self.nodes = nodes
+        self.colormap = colormap
+        self.colorset = colorset
+        self._canonicalform = None
+        self.strands = []
+        self.signature = None
+        self.derive_canonical_form(strandgraph, materialize)
 
-    colormap = {}
-    '''map colors to nodes'''
+    @property
+    def canonicalform(self):
+        """
+        canonical form, generated from the strands on demand since it is only needed for output
+        """
+        if self._canonicalform is not None:
+            return self._canonicalform
+        return self.generate_canonical_form()
 
-    colorset = {}
-    '''set of colors'''
+    def set_id(self, id):
+        self.id = id
 
-    nodes = []
-    '''strand ids in the species'''
+    def to_record(self):
+        """
+        plain representation of the species for storing it on disk
 
-    canonicalform = ''
-    '''canonical form'''
+        :return: a dictionary of JSON serializable values
+        """
+        return {'nodes': list(self.nodes),
+                'colormap': [[key, sorted(vals)] for key, vals in self.colormap.items()],
+                'canonicalform': self.canonicalform,
+                'parsingseq': list(self.parsingseq)}
 
-    strands = []
-    '''strands'''
+    @staticmethod
+    def from_record(record):
+        """
+        rebuild a species stored by to_record(), the strands are constructed from the canonical form
 
-    parsingseq = []
-    ''' parsing sequence for deriving canonical form'''
+        :param record: a dictionary returned by to_record()
+        :return: a Species object without id
+        """
+        species = Species.__new__(Species)
+        species.id = -1
+        species.signature = None
+        species.nodes = record['nodes']
+        species.colormap = {key: set(vals) for key, vals in record['colormap']}
+        species.colorset = set(species.colormap.keys())
+        species._canonicalform = record['canonicalform']
+        species.key = get_key(species._canonicalform)
+        species.parsingseq = record['parsingseq']
+        species.construct_strands()
+        species._canonicalform = None
+        return species
 
-    def __init__(self, nodes, colorset, colormap, strandgraph):
-        self.nodes = nodes
-        self.colormap = colormap
-        self.colorset = colorset
-        self.derive_canonical_form(strandgraph)
-        self.construct_strands()
+    @staticmethod
+    def from_strands(strands, parsingseq, colormap, key=None):
+        """
+        rebuild a species from its constructed strands, e.g. read from a network file
 
-    def set_id(self, id):
-        self.id = id
+        :param strands: list of Strand objects in canonical order
+        :param parsingseq: strand id of every strand
+        :param colormap: map colors to strand ids
+        :param key: canonical key, derived from the strands if None
+        :return: a Species object without id
+        """
+        species = Species.__new__(Species)
+        species.id = -1
+        species.signature = None
+        species.nodes = list(parsingseq)
+        species.colormap = colormap
+        species.colorset = set(colormap.keys())
+        species._canonicalform = None
+        species.strands = strands
+        species.parsingseq = list(parsingseq)
+        species.key = key if key is not None else get_key(species.generate_canonical_form())
+        return species
 
     @staticmethod
     def derive_rootmap(nodes):
@@ -95,7 +165,7 @@ class Species:
         :param strandgraph:
         :return:
         """
-        q = [queue.Queue() for _ in range(len(nodes))]
+        q = [TraversalQueue() for _ in range(len(nodes))]
         visited = [[False for i in range(len(strandgraph.V))] for j in range(len(nodes))]
         labelling = ['' for _ in range(len(nodes))]
         bondnum = [0 for _ in range(len(nodes))]
@@ -241,7 +311,7 @@ class Species:
                 return i
         return -1
 
-    def traverse(self, strandgraph, curv, q, bondnum, pendingbond, canonical, visited):
+    def traverse(self, strandgraph, curv, q, bondnum, pendingbond, canonical, visited, strands=None):
         """
         traverse the strand and produce a canonical form
 
@@ -252,9 +322,11 @@ class Species:
         :param pendingbond: list of bonds (in domain level) that are pending to add
         :param canonical: canonical form
         :param visited: boolean list for visiting vertices in species
+        :param strands: list to append the strand with renumbered bonds to, None if only the form is needed
         :return: canonical form for one strand
         """
         string = '<'
+        strand = sta.Strand()
         bondgraph = strandgraph.bondgraph
 
         E = []
@@ -268,6 +340,7 @@ class Species:
 
         for i in range(0, domlen):
             domain = strandgraph.strands[curv].domains[i]
+            bondname = ''
 
             string += domain.name
 
@@ -280,46 +353,79 @@ class Species:
             if flag:
                 if i != domlen - 1:
                     string += ' '
+                strand.add_domain(sta.Domain(domain.name, domain.toehold, domain.comp, False, ''))
                 continue
 
             if len(E) > 0:
                 pos = self.check_pendingbond((curv, i), pendingbond)
                 if pos != -1:
-                    string += '!' + str(pendingbond[pos][1])
+                    bondname = str(pendingbond[pos][1])
+                    string += '!' + bondname
                     pendingbond.pop(pos)
                     E.pop(cursor)
                     if cursor >= len(E):
                         flag = True
                 elif not flag and (curv, i) == E[cursor][0]:
                     bondnum += 1
-                    string += '!' + str(bondnum)
+                    bondname = str(bondnum)
+                    string += '!' + bondname
                     pendingbond.append((E[cursor][1], bondnum))
-                    if not visited[E[cursor][1][0]] and not E[cursor][1][0] in q.queue:
+                    if not visited[E[cursor][1][0]] and E[cursor][1][0] not in q:
                         q.put(E[cursor][1][0])
                     cursor += 1
                     if cursor >= len(E):
                         flag = True
             if i != domlen - 1:
                 string += ' '
+            strand.add_domain(sta.Domain(domain.name, domain.toehold, domain.comp, bondname != '', bondname))
 
         string += '>'
         canonical += string
+        if strands is not None:
+            strands.append(strand)
         return canonical, q, bondnum, pendingbond
 
-    def derive_canonical_form(self, strandgraph):
+    def derive_canonical_form(self, strandgraph, materialize=True):
         """
-        derive a canonical form for the species
+        derive the canonical key for the species and build its strands with the bonds renumbered in
+        traversal order. The canonical form string is only hashed, it is never kept.
 
         :param strandgraph: a StrandGraph object
+        :param materialize: False to derive the key only, materialize() builds the strands later
         """
         startingv = self.get_starting_vertex(strandgraph)
+        self.key, self.parsingseq = self.walk(strandgraph, startingv, [] if materialize else None)
+
+    def materialize(self, strandgraph):
+        """
+        build the strands of a species created with materialize=False, once it is known to be new
+
+        :param strandgraph: the StrandGraph object the species was derived from
+        """
+        self.walk(strandgraph, self.parsingseq[0], [])
+
+    def walk(self, strandgraph, startingv, strands=None):
+        """
+        traverse the species from the starting vertex
+
+        :param strandgraph: a StrandGraph object
+        :param startingv: starting vertex
+        :param strands: empty list to collect the strands in, None to skip building them
+        :return: canonical key, parsing sequence
+        """
         bondnum = 0
 
+        recolormap = {}
+        if strands is not None:
+            for key, vals in self.colormap.items():
+                for val in vals:
+                    recolormap[val] = key
+
         parsingseq = []
-        canonical = ''
         pendingbond = []
-        q = queue.Queue()
+        q = TraversalQueue()
         visited = [False for i in range(0, len(strandgraph.V))]
+        h = hashlib.blake2b(digest_size=16)
 
         q.put(startingv)
 
@@ -327,12 +433,17 @@ class Species:
             curv = q.get()
             parsingseq.append(curv)
             visited[curv] = True
-            canonical, q, bondnum, pendingbond = self.traverse(strandgraph, curv, q, bondnum, pendingbond, canonical, visited)
+            string, q, bondnum, pendingbond = self.traverse(strandgraph, curv, q, bondnum, pendingbond, '', visited,
+                                                            strands)
+            if strands is not None:
+                strands[-1].add_color(recolormap[curv])
+            h.update(string.encode())
             if not q.empty():
-                canonical += '|'
+                h.update(b'|')
 
-        self.canonicalform = canonical
-        self.parsingseq = parsingseq
+        if strands is not None:
+            self.strands = strands
+        return h.digest(), parsingseq
 
     def construct_strands(self):
         """
@@ -344,25 +455,41 @@ class Species:
                 recolormap[val] = key
 
         strands = []
-        l = self.canonicalform.split('|')
+        l = self._canonicalform.split('|')
         for i in range(0, len(l)):
             strand = lex.lexer_strand(l[i], 0)
             strand.add_color(recolormap[self.parsingseq[i]])
             strands.append(strand)
         self.strands = strands
 
+    def generate_canonical_form(self):
+        """
+        write the canonical form of the constructed strands, the inverse of construct_strands()
+
+        :return: string of canonical form
+        """
+        l = []
+        for strand in self.strands:
+            doms = []
+            for domain in strand.domains:
+                string = domain.name
+                if domain.toehold:
+                    string += '^'
+                if domain.comp:
+                    string += '*'
+                if domain.bond:
+                    string += '!' + domain.bondname
+                doms.append(string)
+            l.append('<' + ' '.join(doms) + '>')
+        return '|'.join(l)
+
     def generate_output(self):
         """
         supporting function for txt output
 
         :return: string of canonical form
         """
-        string = ''
-        string += str(self.id) + '\n'
-        l = self.canonicalform.split('|')
-        for i in range(0, len(l)):
-            string += l[i] + '\n'
-        return string
+        return str(self.id) + '\n' + self.canonicalform.replace('|', '\n') + '\n'
 
     '''
     def generate_sites(self):
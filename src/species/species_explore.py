@@ -1,10 +1,14 @@
 from src.strand import strand_graph as sg, bond_graph as bg
 from src.basics import check_rules as cr
 from src.species import species as sp
+from src.species import reaction_cache as rc
 from src.util import util
 from src.reaction import reaction as ra
 from collections import defaultdict
-import copy
+from bidict import bidict
+
+reactioncache = rc.ReactionCache()
+'''reactions of the species explored in this process, shared by mono() and bi()'''
 
 
 def check_existence(species, specieslist, speciesidmap):
@@ -13,16 +17,16 @@ def check_existence(species, specieslist, speciesidmap):
 
     :param species: produced species
     :param specieslist: list of species in the system
-    :param speciesidmap: bi-directional map of species id and species canonical form
+    :param speciesidmap: bi-directional map of species id and species canonical key
     :return: specieslist, speciesidmap
     """
-    if not speciesidmap.inverse.__contains__(species.canonicalform):
+    if not speciesidmap.inverse.__contains__(species.key):
         species.set_id(len(specieslist) + 1)
         specieslist.append(species)
-        speciesidmap.put(species.id, species.canonicalform)
+        speciesidmap.put(species.id, species.key)
         pos = species.id
     else:
-        pos = speciesidmap.inverse[species.canonicalform]
+        pos = speciesidmap.inverse[species.key]
     return specieslist, speciesidmap, pos
 
 
@@ -43,6 +47,21 @@ def generate_colorinfo(color):
     return colorset, colormap
 
 
+def add_product(newspecies, strandgraph, specieslist, speciesidmap, reaction):
+    """
+    add a product derived without strands to the reaction, the strands are only built if it is a new species
+
+    :param newspecies: a Species object created with materialize=False
+    :param strandgraph: the StrandGraph object the species was derived from
+    :return: specieslist, speciesidmap, reaction
+    """
+    if not speciesidmap.inverse.__contains__(newspecies.key):
+        newspecies.materialize(strandgraph)
+    specieslist, speciesidmap, pos = check_existence(newspecies, specieslist, speciesidmap)
+    reaction.add_product(specieslist[pos - 1])
+    return specieslist, speciesidmap, reaction
+
+
 def generate_species(strandgraph, specieslist, speciesidmap, reaction):
     """
     generate a species
@@ -54,10 +73,8 @@ def generate_species(strandgraph, specieslist, speciesidmap, reaction):
     :return: specieslist, speciesidmap
     """
     colorset, colormap = generate_colorinfo(strandgraph.color)
-    newspecies = sp.Species(strandgraph.V, colorset, colormap, strandgraph)
-    specieslist, speciesidmap, pos = check_existence(newspecies, specieslist, speciesidmap)
-    reaction.add_product(specieslist[pos - 1])
-    return specieslist, speciesidmap, reaction
+    newspecies = sp.Species(strandgraph.V, colorset, colormap, strandgraph, False)
+    return add_product(newspecies, strandgraph, specieslist, speciesidmap, reaction)
 
 
 def generate_multiple_species(strandgraph, specieslist, speciesidmap, reaction):
@@ -74,14 +91,80 @@ def generate_multiple_species(strandgraph, specieslist, speciesidmap, reaction):
         speciesnodes = strandgraph.bondgraph.get_species()
         for i in speciesnodes:
             sub = bg.SubBondGraph(i, strandgraph.color, strandgraph.bondgraph.adj, strandgraph.V)
-            newspecies = sp.Species(i, sub.colorset, sub.colormap, strandgraph)
-            specieslist, speciesidmap, pos = check_existence(newspecies, specieslist, speciesidmap)
-            reaction.add_product(specieslist[pos - 1])
+            newspecies = sp.Species(i, sub.colorset, sub.colormap, strandgraph, False)
+            specieslist, speciesidmap, reaction = add_product(newspecies, strandgraph, specieslist, speciesidmap,
+                                                              reaction)
     else:
         specieslist, speciesidmap, reaction = generate_species(strandgraph, specieslist, speciesidmap, reaction)
     return specieslist, speciesidmap, reaction
 
 
+def apply_cached_reactions(reactants, cached, specieslist, speciesidmap, reactionlist, kinetics):
+    """
+    add the reactions found in the reaction cache, products are added to the system as if they were just generated
+
+    :param reactants: list of reactant species
+    :param cached: list of (rule name, product species) from the reaction cache
+    :param specieslist:
+    :param speciesidmap:
+    :param reactionlist:
+    :param kinetics:
+    :return: specieslist, speciesidmap, reactionlist
+    """
+    for rule, products in cached:
+        reaction = ra.Reaction(list(reactants), [])
+        for p in products:
+            specieslist, speciesidmap, pos = \
+                check_existence(reactioncache.copy_product(p), specieslist, speciesidmap)
+            reaction.add_product(specieslist[pos - 1])
+        reaction.add_rule(rule)
+        reaction.add_rate(kinetics[rule])
+        reactionlist.append(reaction)
+    return specieslist, speciesidmap, reactionlist
+
+
+def get_signature(species, strandgraph=None):
+    """
+    derive the signature of a species: its unbound domains that are not hidden, split into toeholds
+    and other domains. The result is stored in the species.
+
+    :param species: a Species object
+    :param strandgraph: the StrandGraph object of the species if it is already built
+    :return: (toeholds, others), frozensets of (domain name, comp)
+    """
+    if species.signature is None:
+        if strandgraph is None:
+            strandgraph = sg.StrandGraph(species.strands)
+        hidden = set(strandgraph.bondgraph.hidden)
+        toeholds = set()
+        others = set()
+        for i in range(0, len(strandgraph.strands)):
+            domains = strandgraph.strands[i].domains
+            for j in range(0, len(domains)):
+                if domains[j].bond or (i, j) in hidden:
+                    continue
+                if domains[j].toehold:
+                    toeholds.add((domains[j].name, domains[j].comp))
+                else:
+                    others.add((domains[j].name, domains[j].comp))
+        species.signature = (frozenset(toeholds), frozenset(others))
+    return species.signature
+
+
+def can_bind(species1, species2):
+    """
+    check if two species have a pair of complementary free toeholds, which any binding between
+    two species needs
+
+    :return: True if a binding is possible, False otherwise
+    """
+    toeholds2 = get_signature(species2)[0]
+    for name, comp in get_signature(species1)[0]:
+        if (name, not comp) in toeholds2:
+            return True
+    return False
+
+
 def check_hidden_prevbond(E, strandgraph):
     hiddenset = set(strandgraph.bondgraph.hidden)
     for e in E:
@@ -100,13 +183,20 @@ def mono(species, specieslist, speciesidmap, reactionlist, kinetics):
     :param speciesidmap:
     :return: specieslist, speciesidmap
     """
+    key = reactioncache.get_key(species)
+    cached = reactioncache.get(key)
+    if cached is not None:
+        return apply_cached_reactions([species], cached, specieslist, speciesidmap, reactionlist, kinetics)
+    start = len(reactionlist)
+
     strandgraph = sg.StrandGraph(species.strands)
+    get_signature(species, strandgraph)
 
-    prevE = strandgraph.E
-    prevSG = copy.copy(strandgraph)
+    # every candidate changes strandgraph in place and is undone afterwards,
+    # so the rules are always checked on the graph of the species itself
     flag = False
 
-    e3, e4 = cr.check_migration(prevSG)
+    e3, e4 = cr.check_migration(strandgraph)
     if len(e3) != 0:
         miggroup = strandgraph.bondgraph.check_following_migration(e3)
 
@@ -127,14 +217,15 @@ def mono(species, specieslist, speciesidmap, reactionlist, kinetics):
                         continue
             '''
             reaction = ra.Reaction([species], [])
-            E = copy.copy(prevE)
+            delete = []
+            add = []
             notbond = []
             potbondto = []
             for i in range(0, len(x)):
                 if not strandgraph.check_hidden_all(e3[x[i]]):
                     flag = True
-                E.remove(e3[x[i]][1])
-                E.append(e3[x[i]][0])
+                delete.append(e3[x[i]][1])
+                add.append(e3[x[i]][0])
                 notbond += list(e3[x[i]][0] - e3[x[i]][1])
                 potbondto += list(e3[x[i]][0] & e3[x[i]][1])
 
@@ -150,7 +241,7 @@ def mono(species, specieslist, speciesidmap, reactionlist, kinetics):
             if not flag:
                 continue
 
-            strandgraph.reconstruct(E)
+            mark = strandgraph.change_edges(delete, add)
 
             anchor = False
             for j in range(len(x)):
@@ -159,11 +250,12 @@ def mono(species, specieslist, speciesidmap, reactionlist, kinetics):
                         anchor = True
                         break
             if not anchor:
-                strandgraph.reconstruct(prevE)
+                strandgraph.undo(mark)
                 continue
 
             specieslist, speciesidmap, reaction = \
                 generate_multiple_species(strandgraph, specieslist, speciesidmap, reaction)
+            strandgraph.undo(mark)
             reaction.add_rule('R3')
             reaction.add_rate(kinetics['R3'])
             reactionlist.append(reaction)
@@ -171,26 +263,20 @@ def mono(species, specieslist, speciesidmap, reactionlist, kinetics):
     if len(e4) != 0:
         for x in e4:
             reaction1 = ra.Reaction([species], [])
-            E = copy.copy(prevE)
-            E.remove(x[2])
-            E.remove(x[3])
-            E.append(x[0])
-            E.append(x[1])
-            strandgraph.reconstruct(E)
+            mark = strandgraph.change_edges([x[2], x[3]], [x[0], x[1]])
 
             specieslist, speciesidmap, reaction1 = \
                 generate_multiple_species(strandgraph, specieslist, speciesidmap, reaction1)
+            strandgraph.undo(mark)
             reaction1.add_rule('R4')
             reaction1.add_rate(kinetics['R4'])
             reactionlist.append(reaction1)
 
-    e = cr.check_binding(prevSG)
+    e = cr.check_binding(strandgraph)
     if len(e) != 0:
         for x in e:
             reaction2 = ra.Reaction([species], [])
-            E = copy.copy(prevE)
-            E.append(x)
-            strandgraph.reconstruct(E)
+            mark = strandgraph.change_edges(add=[x])
 
             # check if there is a previous bond hidden
             # if check_hidden_prevbond(prevE, strandgraph):
@@ -198,24 +284,25 @@ def mono(species, specieslist, speciesidmap, reactionlist, kinetics):
 
             specieslist, speciesidmap, reaction2 = \
                 generate_species(strandgraph, specieslist, speciesidmap, reaction2)
+            strandgraph.undo(mark)
             reaction2.add_rule('RB')
             reaction2.add_rate(kinetics['RB'])
             reactionlist.append(reaction2)
 
-    e = cr.check_unbinding(prevSG)
+    e = cr.check_unbinding(strandgraph)
     if len(e) != 0:
         for x in e:
             reaction3 = ra.Reaction([species], [])
-            E = copy.copy(prevE)
-            E.remove(x)
-            strandgraph.reconstruct(E)
+            mark = strandgraph.change_edges(delete=[x])
 
             specieslist, speciesidmap, reaction3 = \
                 generate_multiple_species(strandgraph, specieslist, speciesidmap, reaction3)
+            strandgraph.undo(mark)
             reaction3.add_rule('RU')
             reaction3.add_rate(kinetics['RU'])
             reactionlist.append(reaction3)
 
+    reactioncache.put(key, reactionlist[start:])
     return specieslist, speciesidmap, reactionlist
 
 
@@ -234,12 +321,19 @@ def bi(speciescomb, specieslist, speciesidmap, reactionlist, kinetics):
     species2 = specieslist[index2]
     len1 = len(species1.nodes)
 
-    strandgraph = sg.StrandGraph(species1.strands + species2.strands, merge=len1)
+    # most pairs cannot interact, reject them before building any graph
+    if not can_bind(species1, species2):
+        return specieslist, speciesidmap, reactionlist
 
-    prevE = strandgraph.E
-    prevSG = copy.copy(strandgraph)
+    key = reactioncache.get_key(species1, species2)
+    cached = reactioncache.get(key)
+    if cached is not None:
+        return apply_cached_reactions([species1, species2], cached, specieslist, speciesidmap, reactionlist, kinetics)
+    start = len(reactionlist)
 
-    e = cr.check_binding(prevSG)
+    strandgraph = sg.StrandGraph(species1.strands + species2.strands, merge=len1)
+
+    e = cr.check_binding(strandgraph)
     if len(e) != 0:
         for x in e:
             reaction = ra.Reaction([species1, species2], [])
@@ -248,16 +342,34 @@ def bi(speciescomb, specieslist, speciesidmap, reactionlist, kinetics):
             if (v[0] < len1 and v[1] < len1) or (v[0] >= len1 and v[1] >= len1):
                 continue
 
-            E = copy.copy(prevE)
-            E.append(x)
-            strandgraph.reconstruct(E)
+            mark = strandgraph.change_edges(add=[x])
 
             # if check_hidden_prevbond(prevE, strandgraph):
             #    continue
 
             specieslist, speciesidmap, reaction = generate_species(strandgraph, specieslist, speciesidmap, reaction)
+            strandgraph.undo(mark)
             reaction.add_rule('RB_2')
             reaction.add_rate(kinetics['RB_2'])
             reactionlist.append(reaction)
 
+    reactioncache.put(key, reactionlist[start:])
     return specieslist, speciesidmap, reactionlist
+
+
+def explore(reactants, kinetics):
+    """
+    find the reactions of one species (mono) or one species pair (bi) on their own, used by worker processes.
+    Products are collected in a private species list, the caller merges them into the DSD system.
+
+    :param reactants: list of one or two Species objects
+    :param kinetics:
+    :return: list of Reaction objects without reactants
+    """
+    if len(reactants) == 1:
+        specieslist, speciesidmap, reactionlist = mono(reactants[0], [], bidict(), [], kinetics)
+    else:
+        specieslist, speciesidmap, reactionlist = bi((0, 1), list(reactants), bidict(), [], kinetics)
+    for r in reactionlist:
+        r.reactants = []
+    return reactionlist
@@ -1,16 +1,34 @@
-from src.species import species_explore as se
-from src.util import util, cexception
-from src.basics import output as on, generate_pysbmodel as gp, initialize_system
+from src.util import cexception, profiler
+from src.basics import output as on, generate_pysbmodel as gp, initialize_system, graph_processor, worklist as wl
+from src.basics import enumeration_cache as ec, simulator as sim, network_file as nf
+from src.basics import checkpoint as cp
+import multiprocessing
 import os
 
 
-def start_processor(filedir='../res/input', threshold=10, window=None):
+def start_processor(filedir='../res/input', threshold=10, window=None, cache=True, processes=1, profile=False,
+                    simumode='bng', runs=1, export=False, checkpoint=0, resume=False,
+                    budget=None):
     """
     the entry point to DSDPy
 
     :param window:
     :param threshold:
     :param filedir: file directory to the input file
+    :param cache: reuse reactions found in earlier runs, stored in enumeration_cache.sqlite in the output directory
+    :param processes: number of worker processes to expand each round with, 1 runs everything in this process
+    :param profile: write per-round timing and counters of the enumeration to profile.json in the output directory
+    :param simumode: 'bng' for the stochastic BNG simulation of the PySB model, 'ode' or 'ssa' for the native
+        ODE or stochastic simulation
+    :param runs: number of trajectories of the 'ssa' simulation, the mean and standard deviation are drawn if more
+        than one; they run in a pool of the given number of processes
+    :param export: also write the network in the binary format of network_file to the network directory in the
+        output directory
+    :param checkpoint: save the enumeration state to the checkpoint directory in the output directory every this
+        many rounds, 0 to never save it
+    :param resume: continue the enumeration from the checkpoint in the output directory if there is one
+    :param budget: a budget.Budget object limiting the enumeration, the species not fully expanded when a budget
+        is used up are listed as truncated species in output.txt
     """
     # initialization
     if not os.path.exists(filedir):
@@ -22,8 +40,8 @@ def start_processor(filedir='../res/input', threshold=10, window=None):
 
     if outdir == '':
         outdir = 'output'
-        if not os.path.exists(outdir):
-            os.makedirs(outdir)
+    if not os.path.exists(outdir):
+        os.makedirs(outdir)
     if len(simupara) == 0:
         simupara = [100, 100]
     initlen = len(specieslist)
@@ -34,64 +52,109 @@ def start_processor(filedir='../res/input', threshold=10, window=None):
         raise cexception.SpeciesError("there are more initial species names than the number of initial species")
 
     reactionlist = []
-    visited = [False for _ in range(0, len(specieslist))]
-    indexlist = []
-    cursor = 0
+    worklist = wl.Worklist(len(specieslist))
     iteration = 0
-
-    # explore all possibilities in species with regards to the initial DSD system
-    while not visited[cursor]:
-        indexlist += [i for i in range(cursor, len(specieslist))]
-        oldlen = len(visited)
-
-        for i in range(cursor, oldlen):
-            specieslist, speciesidmap, reactionlist = se.mono(specieslist[i],
-                                                              specieslist,
-                                                              speciesidmap,
-                                                              reactionlist,
-                                                              kinetics)
-            visited[i] = True
-
-        newlen = len(specieslist)
-
-        comb = util.get_combinations(oldlen, newlen, cursor, indexlist)
-
-        for i in comb:
-            specieslist, speciesidmap, reactionlist = se.bi(i,
-                                                            specieslist,
-                                                            speciesidmap,
-                                                            reactionlist,
-                                                            kinetics)
-
-        if oldlen != len(specieslist):
-            cursor = oldlen
-        else:
-            cursor = oldlen - 1
-        for i in range(oldlen, len(specieslist)):
-            visited.append(False)
-
-        if iteration == threshold:
-            break
-        iteration += 1
+    checkpointdir = outdir + '/checkpoint'
+    if resume and cp.exists(checkpointdir):
+        info, initnames, concentrations, _, simupara, initlen = graph_processor.resume(checkpointdir)
+        specieslist, speciesidmap, reactionlist, kinetics, worklist = info
+        iteration = len(worklist.rounds)
+    diskcache = None
+    pool = None
+    try:
+        if cache:
+            diskcache = ec.EnumerationCache(outdir + '/enumeration_cache.sqlite')
+        if processes > 1:
+            pool = multiprocessing.Pool(processes)
+        if profile:
+            profiler.enable()
+        writer = on.NetworkWriter(outdir)
+        if budget is not None:
+            budget.start()
+
+        # explore all possibilities in species with regards to the initial DSD system
+        while not worklist.empty():
+            specieslist, speciesidmap, reactionlist, kinetics, worklist = \
+                graph_processor.one_iteration(specieslist, speciesidmap, reactionlist, kinetics, worklist,
+                                              diskcache, pool, budget, processes)
+            writer.update(specieslist, reactionlist)
+            if checkpoint > 0 and len(worklist.rounds) % checkpoint == 0:
+                cp.save_checkpoint(checkpointdir, (specieslist, speciesidmap, reactionlist, kinetics, worklist),
+                                   initnames, concentrations, outdir, simupara, initlen)
+
+            if iteration == threshold:
+                break
+            iteration += 1
+    finally:
+        # release the pool, the cache and the profiler whether the enumeration finished or raised
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if diskcache is not None:
+            diskcache.close()
+        if profile:
+            profiler.disable()
+
+    if profile:
+        profiler.dump(outdir + '/profile.json')
+    if budget is not None and budget.reason is not None:
+        print('Enumeration stopped by the ' + budget.reason + ' budget, ' + str(len(worklist.truncated)) +
+              ' species are truncated.')
+
+    # output for GUI interface, written before the simulation so that it is complete even if the simulation fails
+    writer.close(specieslist, reactionlist, worklist.truncated)
+    if export:
+        nf.write_network(outdir + '/network', specieslist, reactionlist)
 
     # example use for a possible debugging option defobs :
     # md = gp.generate_model(specieslist, reactionlist, initlen, initnames, concentrations, defobs=[8, 10])
 
-    md = gp.generate_model(specieslist, reactionlist, initlen, initnames, concentrations)
-
-    # if there can be reactions, then simulate
-    if len(md.rules) != 0:
-        # example use for using Scipy ODE simulator:
-        # on.simulate_scipy(md, filedir=outdir, time=simupara[0], steps=simupara[1])
-        x, y, obs = on.simulate_bng(md,
-                        time=simupara[0],
-                        steps=simupara[1])
-        on.visualize_simulation_results(x, y, obs, filedir=outdir)
-
-    # output for GUI interface
-    on.output_network_txt(specieslist,
-                          reactionlist,
-                          filedir=outdir)
+    if simumode == 'ode' or simumode == 'ssa':
+        network = sim.Network(specieslist, reactionlist, initlen, initnames, concentrations)
+        if network.get_reactionnum() != 0:
+            var = None
+            if simumode == 'ode':
+                x, y, obs = sim.simulate_ode(network, time=simupara[0], steps=simupara[1])
+            elif runs > 1:
+                x, y, var, obs = sim.simulate_ensemble(network, runs, time=simupara[0], steps=simupara[1],
+                                                       processes=processes)
+            else:
+                x, y, obs = sim.simulate_ssa(network, time=simupara[0], steps=simupara[1])
+            on.visualize_simulation_results(x, y, obs, filedir=outdir, option=simumode, var=var)
+    else:
+        md = gp.generate_model(specieslist, reactionlist, initlen, initnames, concentrations)
+
+        # if there can be reactions, then simulate
+        if len(md.rules) != 0:
+            # example use for using Scipy ODE simulator:
+            # on.simulate_scipy(md, filedir=outdir, time=simupara[0], steps=simupara[1])
+            x, y, obs = on.simulate_bng(md,
+                            time=simupara[0],
+                            steps=simupara[1])
+            on.visualize_simulation_results(x, y, obs, filedir=outdir)
+
+
+def start_sweep(filedir, parametersets, threshold=10, simumode='ode', processes=None):
+    """
+    enumerate the system once and simulate it for every parameter set
+
+    :param filedir: file directory to the input file
+    :param parametersets: list of dictionaries mapping rate names (RB, RU, R3, R4, RB_2) or initial species names
+        to values, e.g. sim.get_grid({'RB': [1e-4, 3e-4], 'gate1': [500, 1000]})
+    :param threshold: maximum number of enumeration rounds
+    :param simumode: 'ode' or 'ssa'
+    :param processes: number of worker processes of the simulations, None for one per CPU
+    :return: time points, amounts (parameter sets x time points x species) and observables, None if there is no
+        reaction
+    """
+    info, initnames, concentrations, outdir, simupara, initlen = graph_processor.initiation(filedir)
+    iteration = 0
+    while not info[4].empty() and iteration <= threshold:
+        info = graph_processor.one_iteration(*info)
+        iteration += 1
+
+    return graph_processor.sweep_simulation(info[0], info[2], initlen, initnames, concentrations, simupara,
+                                            parametersets, simumode, processes)
 
 #start_processor(filedir='../res/input')
 
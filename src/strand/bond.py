@@ -1,25 +1,21 @@
+from array import array
+
+
 class Bond:
     """
     Data structure of bonds between two domains
     """
 
-    node1 = 0
-    '''start node'''
-
-    node2 = 0
-    '''end node'''
-
-    dom = []
-    '''domain of the startnode'''
-
-    dom2 = []
-    '''domain of the endnode'''
+    __slots__ = {'node1': 'start node',
+                 'node2': 'end node',
+                 'dom': 'domain indices on the startnode, array of int',
+                 'dom2': 'domain indices on the endnode, array of int'}
 
     def __init__(self, node1, node2, dom, dom2):
         self.node1 = node1
         self.node2 = node2
-        self.dom = dom
-        self.dom2 = dom2
+        self.dom = array('i', dom)
+        self.dom2 = array('i', dom2)
 
     def appenddom(self, dom, dom2):
         """
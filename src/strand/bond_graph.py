@@ -1,6 +1,6 @@
 from src.strand import bond
 from src.util import util
-import queue
+from src.util.traversal_queue import TraversalQueue
 import copy
 from collections import defaultdict
 
@@ -19,29 +19,80 @@ class BondGraph:
     adj = []
     '''adjacency list'''
 
-    hidden = []
-    '''hidden domains of strands'''
-
-    loop = []
-    '''loops in the graph'''
-
-    species = []
-    '''species of the graph'''
-
-    speciesnum = 0
-    '''species number'''
-
     color = []
     '''inherit from StrandGraph'''
 
+    dirty = False
+    '''True if the edges changed after the loops, hidden domains and species were derived'''
+
+    journal = []
+    '''changes made by add_edge() and remove_edge(), used by undo()'''
+
     def __init__(self, V, color, E):
         self.V = V
         self.color = color
         self.E = E
         self.adj = [[] for _ in self.V]
+        self.journal = []
+        self.dirty = False
+        self._hidden = []
+        self._loop = []
+        self._species = []
+        self._speciesnum = 0
+
+    @property
+    def hidden(self):
+        """hidden domains of strands"""
+        if self.dirty:
+            self.refresh()
+        return self._hidden
+
+    @hidden.setter
+    def hidden(self, hidden):
+        self._hidden = hidden
+
+    @property
+    def loop(self):
+        """loops in the graph"""
+        if self.dirty:
+            self.refresh()
+        return self._loop
+
+    @loop.setter
+    def loop(self, loop):
+        self._loop = loop
+
+    @property
+    def species(self):
+        """species of the graph"""
+        if self.dirty:
+            self.refresh()
+        return self._species
+
+    @species.setter
+    def species(self, species):
+        self._species = species
+
+    @property
+    def speciesnum(self):
+        """species number"""
+        if self.dirty:
+            self.refresh()
+        return self._speciesnum
+
+    @speciesnum.setter
+    def speciesnum(self, speciesnum):
+        self._speciesnum = speciesnum
+
+    def refresh(self):
+        """
+        derive the species, loops and hidden domains from the current adjacency list
+        """
+        self.dirty = False
         self.hidden = []
         self.loop = []
-        self.species = []
+        self.find_loops()
+        self.store_hidden()
 
     def create_bond(self, v1, v2, d1, d2):
         """
@@ -80,8 +131,107 @@ class BondGraph:
         """
         self.create_bond(v1, v2, d1, d2)
         self.create_bond(v2, v1, d2, d1)
+        self.dirty = True
         #self.map_colors({(v1, d1), (v2, d2)})
 
+    def link(self, v1, v2, d1, d2):
+        """
+        add the domain pair to the bond from v1 to v2 and record it in the journal
+
+        :param v1: the strand to be examined
+        :param v2: the target strand
+        :param d1: domain on v1
+        :param d2: domain on v2
+        """
+        b = self.get_bond(v1, v2)
+        if b is None:
+            b = bond.Bond(v1, v2, [d1], [d2])
+            self.adj[v1].append(b)
+            self.journal.append(('link', v1, b, True))
+        else:
+            b.appenddom(d1, d2)
+            self.journal.append(('link', v1, b, False))
+
+    def unlink(self, v1, v2, d1, d2):
+        """
+        delete the domain pair from the bond from v1 to v2 and record it in the journal
+
+        :param v1: the strand to be examined
+        :param v2: the target strand
+        :param d1: domain on v1
+        :param d2: domain on v2
+        """
+        for p in range(0, len(self.adj[v1])):
+            b = self.adj[v1][p]
+            if b.node2 != v2:
+                continue
+            for q in range(0, len(b.dom)):
+                if b.dom[q] == d1 and b.dom2[q] == d2:
+                    b.dom.pop(q)
+                    b.dom2.pop(q)
+                    if len(b.dom) == 0:
+                        self.adj[v1].pop(p)
+                    self.journal.append(('unlink', v1, b, p, q, d1, d2))
+                    return
+
+    def add_edge(self, e):
+        """
+        add an edge in place. The species, loops and hidden domains are derived again when they are needed
+
+        :param e: a set of two domains
+        """
+        v, n = util.get_edge_info(e)
+        self.link(v[0], v[1], n[0], n[1])
+        self.link(v[1], v[0], n[1], n[0])
+        self.dirty = True
+
+    def remove_edge(self, e):
+        """
+        delete an edge in place. The species, loops and hidden domains are derived again when they are needed
+
+        :param e: a set of two domains
+        """
+        v, n = util.get_edge_info(e)
+        self.unlink(v[0], v[1], n[0], n[1])
+        self.unlink(v[1], v[0], n[1], n[0])
+        self.dirty = True
+
+    def checkpoint(self):
+        """
+        mark the current state of the graph
+
+        :return: a mark to be passed to undo()
+        """
+        return len(self.journal), self._species, self._speciesnum, self._loop, self._hidden, self.dirty
+
+    def undo(self, mark):
+        """
+        revert all changes made after the mark was taken
+
+        :param mark: return value of checkpoint()
+        """
+        length, species, speciesnum, loop, hidden, dirty = mark
+        while len(self.journal) > length:
+            change = self.journal.pop()
+            v, b = change[1], change[2]
+            if change[0] == 'link':
+                if change[3]:
+                    self.adj[v].pop()
+                else:
+                    b.dom.pop()
+                    b.dom2.pop()
+            else:
+                p, q, d1, d2 = change[3:]
+                b.dom.insert(q, d1)
+                b.dom2.insert(q, d2)
+                if len(b.dom) == 1:
+                    self.adj[v].insert(p, b)
+        self._species = species
+        self._speciesnum = speciesnum
+        self._loop = loop
+        self._hidden = hidden
+        self.dirty = dirty
+
     def check_in_loop(self, startnode, endnode):
         """
         check if the two vertices are in the same loop
@@ -295,7 +445,7 @@ class BondGraph:
             else:
                 return False
 
-        q = queue.Queue()
+        q = TraversalQueue()
         visited = [False for _ in self.V]
         flag = False
 
@@ -400,7 +550,7 @@ class BondGraph:
         :param endstrand: end strand
         :return: path from startnode to end strand
         """
-        q = queue.Queue()
+        q = TraversalQueue()
         visited = [False for _ in self.V]
         flag = False
         prev = {}
@@ -444,7 +594,7 @@ class BondGraph:
         if len(self.V) <= 2:
             return False
 
-        q = queue.Queue()
+        q = TraversalQueue()
         visited = [False for _ in range(len(self.V))]
         direction = [0 for _ in range(len(self.V))]
         cnt = 0
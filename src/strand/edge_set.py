@@ -0,0 +1,74 @@
+class EdgeSet:
+    """
+    Set of edges of a strand graph. Edges are stored as frozensets in insertion order, so membership
+    tests are O(1) while iteration, append and remove behave like the former list of sets
+    """
+
+    edges = {}
+    '''edges (frozensets of two domains) mapped to None, ordered by insertion'''
+
+    def __init__(self, edges=()):
+        self.edges = dict.fromkeys(frozenset(e) for e in edges)
+
+    def __contains__(self, edge):
+        return frozenset(edge) in self.edges
+
+    def __iter__(self):
+        return iter(self.edges)
+
+    def __len__(self):
+        return len(self.edges)
+
+    def __eq__(self, other):
+        if isinstance(other, EdgeSet):
+            return self.edges.keys() == other.edges.keys()
+        return self.edges.keys() == set(frozenset(e) for e in other)
+
+    def __repr__(self):
+        return 'EdgeSet(' + str([set(e) for e in self.edges]) + ')'
+
+    def __copy__(self):
+        return self.copy()
+
+    def copy(self):
+        """
+        copy the edge set, the edges themselves are immutable and shared
+
+        :return: an EdgeSet object
+        """
+        e = EdgeSet()
+        e.edges = self.edges.copy()
+        return e
+
+    def add(self, edge):
+        """
+        add an edge, it is placed after all the existing edges
+
+        :param edge: a set of two domains
+        """
+        self.edges[frozenset(edge)] = None
+
+    def discard(self, edge):
+        """
+        delete an edge if it exists
+
+        :param edge: a set of two domains
+        """
+        self.edges.pop(frozenset(edge), None)
+
+    def append(self, edge):
+        """
+        list compatible version of add()
+        """
+        self.add(edge)
+
+    def remove(self, edge):
+        """
+        list compatible remove, raise ValueError if the edge does not exist
+
+        :param edge: a set of two domains
+        """
+        try:
+            del self.edges[frozenset(edge)]
+        except KeyError:
+            raise ValueError(str(set(edge)) + ' is not an edge')
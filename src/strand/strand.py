@@ -1,16 +1,17 @@
+import sys
+
+
 class Strand:
     """
     Data structure of the strand
     """
 
-    domains = []
-    '''domains of the strand'''
-
-    color = 0
-    '''color of the strand'''
+    __slots__ = {'domains': 'domains of the strand',
+                 'color': 'color of the strand'}
 
     def __init__(self):
         self.domains = []
+        self.color = 0
 
     def add_domain(self, domain):
         self.domains.append(domain)
@@ -38,34 +39,25 @@ class Strand:
 
 class Domain:
     """
-    Data structure of the domain
+    Data structure of the domain. Names are interned, so all domains of the same name share one string
     """
 
-    name = ''
-    '''name of the domain'''
-
-    toehold = False
-    '''boolean variable indicating if the domain is a toehold'''
-
-    comp = False
-    '''boolean variable indicating if the domain is a complementary domain to some other domain'''
-
-    bond = False
-    '''boolean variable indicating if the domain is bonded'''
-
-    bondname = ''
-    '''name of the bond, empty if not bonded'''
+    __slots__ = {'name': 'name of the domain',
+                 'toehold': 'boolean variable indicating if the domain is a toehold',
+                 'comp': 'boolean variable indicating if the domain is a complementary domain to some other domain',
+                 'bond': 'boolean variable indicating if the domain is bonded',
+                 'bondname': 'name of the bond, empty if not bonded'}
 
     def __init__(self, name, toehold, comp, bond, bondname):
-        self.name = name
+        self.name = sys.intern(name)
         self.toehold = toehold
         self.comp = comp
         self.bond = bond
-        self.bondname = bondname
+        self.bondname = sys.intern(bondname)
 
     def set_bond(self, bondname):
         self.bond = True
-        self.bondname = bondname
+        self.bondname = sys.intern(bondname)
 
     def check_same_domain(self, domain1):
         """
@@ -1,7 +1,10 @@
 from src.util import util
 from src.util import cexception as ex
 from src.strand import bond_graph
+from src.strand.edge_set import EdgeSet
 import copy
+import bisect
+from collections import defaultdict
 
 
 class StrandGraph:
@@ -19,13 +22,13 @@ class StrandGraph:
     '''strand type'''
 
     A = []
-    '''admissible edges, edges that bonds can exist in'''
+    '''admissible edges (frozensets of two domains), edges that bonds can exist in'''
 
     toehold = []
     '''a list of dictionaries to store if toehold exist in an edge'''
 
-    E = []
-    '''actual edges, edges that already exist'''
+    E = None
+    '''actual edges, edges that already exist (an EdgeSet object)'''
 
     strands = []
     '''strands in this graph'''
@@ -39,18 +42,12 @@ class StrandGraph:
 
         :param strands: list of Strand type objects
         """
-        def comp(a, b):
-            if a[2] == b[2]:
-                return False
-            else:
-                return True
-
         V = [i for i in range(0, len(strands))]
 
         color = [strands[i].color for i in range(0, len(strands))]
         length = [len(strands[i].domains) for i in range(0, len(strands))]
         A = []
-        E = []
+        E = EdgeSet()
         toehold = {}
 
         tableS = []
@@ -77,6 +74,11 @@ class StrandGraph:
                     j += 1
                 i += 1
 
+        # index the domains by name and complementarity, only the complementary bucket needs to be paired
+        domainindex = defaultdict(list)
+        for i in range(0, len(tableS)):
+            domainindex[(tableS[i][0][0], tableS[i][0][2])].append(i)
+
         for i in range(0, len(tableS)):
             cur = tableS[i]
             if cur[1]:
@@ -84,20 +86,21 @@ class StrandGraph:
             else:
                 bondexist = False
 
-            for j in range(i + 1, len(tableS)):
-                if tableS[j][0][0] == cur[0][0] and comp(tableS[j][0], cur[0]):
-                    A.append({cur[0][1], tableS[j][0][1]})
-                    if tableS[j][0][3] == cur[0][3] == 1 and tableS[j][0][4] == cur[0][4] and not tableS[j][1] and not cur[1]:
-                        E.append({cur[0][1], tableS[j][0][1]})
-                        bondexist = True
-                        tableS[j][1] = True
-                        cur[1] = True
-                    if tableS[j][0][5] == cur[0][5] == True:
-                        toehold[frozenset({cur[0][1], tableS[j][0][1]})] = True
-                        # toehold.append({'e': {cur[0][1], tableS[j][0][1]}, 't': True})
-                    else:
-                        toehold[frozenset({cur[0][1], tableS[j][0][1]})] = False
-                        # toehold.append({'e': {cur[0][1], tableS[j][0][1]}, 't': False})
+            candidates = domainindex.get((cur[0][0], not cur[0][2]), [])
+            for j in candidates[bisect.bisect_right(candidates, i):]:
+                edge = frozenset({cur[0][1], tableS[j][0][1]})
+                A.append(edge)
+                if tableS[j][0][3] == cur[0][3] == 1 and tableS[j][0][4] == cur[0][4] and not tableS[j][1] and not cur[1]:
+                    E.add(edge)
+                    bondexist = True
+                    tableS[j][1] = True
+                    cur[1] = True
+                if tableS[j][0][5] == cur[0][5] == True:
+                    toehold[edge] = True
+                    # toehold.append({'e': {cur[0][1], tableS[j][0][1]}, 't': True})
+                else:
+                    toehold[edge] = False
+                    # toehold.append({'e': {cur[0][1], tableS[j][0][1]}, 't': False})
             if not bondexist and cur[0][3]:
                 raise ex.SpeciesError("species text representation error in domain " + cur[0][0])
 
@@ -114,11 +117,46 @@ class StrandGraph:
         """
         reconstruct the graph using the set of edges
 
-        :param E: edges
+        :param E: edges, an EdgeSet object or a list of sets
         """
+        if not isinstance(E, EdgeSet):
+            E = EdgeSet(E)
         self.E = E
         self.build_bond_graph()
 
+    def change_edges(self, delete=(), add=()):
+        """
+        change the edges of the graph in place instead of rebuilding the bond graph.
+        Edges in delete that do not exist are ignored.
+
+        :param delete: edges to be deleted
+        :param add: edges to be added
+        :return: a mark to revert the change with undo()
+        """
+        mark = (self.E, self.bondgraph.checkpoint())
+        E = self.E.copy()
+        for e in delete:
+            if e in E:
+                E.remove(e)
+                self.bondgraph.remove_edge(e)
+        for e in add:
+            if e not in E:
+                E.add(e)
+                self.bondgraph.add_edge(e)
+        self.E = E
+        self.bondgraph.E = E
+        return mark
+
+    def undo(self, mark):
+        """
+        revert the graph to the state when change_edges() returned the mark
+
+        :param mark: a mark returned by change_edges()
+        """
+        self.E, bmark = mark
+        self.bondgraph.E = self.E
+        self.bondgraph.undo(bmark)
+
     def delete_vertex(self, v):
         strands = copy.copy(self.strands)
         strands.pop(v)
@@ -184,9 +222,7 @@ class StrandGraph:
                 t += 1
             graph.add_edges(v[0], v[1], n[0], n[1])
 
-        graph.find_loops()
-        graph.store_hidden()
-
+        # species, loops and hidden domains are derived when they are first needed
         self.bondgraph = graph
 
     def anti_parallel(self, node1, node2):
@@ -378,16 +414,13 @@ class StrandGraph:
         if notbond in self.bondgraph.hidden:
             return False
 
-        prevE = copy.copy(self.E)
-        self.delete_edge(tbr, prevE)
+        mark = self.change_edges(delete=[tbr])
         connect = self.bondgraph.get_connection(notbond, potbondto[0])
+        self.undo(mark)
 
         if connect is None:
-            self.reconstruct(prevE)
             return False
 
-        self.reconstruct(prevE)
-
         if self.anti_parallel(notbond, potbondto):
             return True
         '''
@@ -461,17 +494,7 @@ class StrandGraph:
         :param v:
         :param prevE:
         """
-        E = copy.copy(prevE)
-        t = 0
-        while 1:
-            for j in E[t]:
-                if v == j[0]:
-                    E.pop(t)
-                    t -= 1
-                    break
-            t += 1
-            if t >= len(E):
-                break
+        E = EdgeSet(e for e in prevE if all(v != j[0] for j in e))
         self.reconstruct(E)
 
     def check_switchable_2(self, r1, tbr):
@@ -488,9 +511,8 @@ class StrandGraph:
         bdomain = list(r1 & tbr[0])
         bdomain = bdomain[0]
 
-        prevE = copy.copy(self.E)
-
         '''
+        prevE = copy.copy(self.E)
         self.delete_edges_regarding_v(cdomain[0], prevE)
 
         if self.bondgraph.speciesnum > 2:
@@ -501,10 +523,8 @@ class StrandGraph:
         '''
         if self.check_switchable(bdomain, tbr[1], r1):
             if self.anchored(r1):
-                self.reconstruct(prevE)
                 return True
 
-        self.reconstruct(prevE)
         return False
 
     def check_hidden_all(self, edge):
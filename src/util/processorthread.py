@@ -30,7 +30,7 @@ class ProcessorThread(threading.Thread):
         self.lock = threading.Lock()
 
     def run(self):
-        while not self._args[6][self._args[5]]:
+        while not self._args[4].empty():
             if self.stopped:
                 return
             self.__flag.wait()
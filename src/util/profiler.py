@@ -0,0 +1,182 @@
+"""
+Timing and counters of the enumeration. enable() wraps the instrumented functions and disable() puts the
+plain functions back, so runs without profiling do not pay for it. Times are inclusive (mono contains
+the rule checks it runs) and only cover the current process, work done in pool workers is not timed.
+"""
+import functools
+import json
+import time
+
+INSTRUMENTED = [('src.species.species_explore', None, 'mono'),
+                ('src.species.species_explore', None, 'bi'),
+                ('src.species.species_explore', None, 'check_existence'),
+                ('src.basics.check_rules', None, 'check_binding'),
+                ('src.basics.check_rules', None, 'check_unbinding'),
+                ('src.basics.check_rules', None, 'check_migration'),
+                ('src.strand.strand_graph', 'StrandGraph', '__init__'),
+                ('src.strand.strand_graph', 'StrandGraph', 'change_edges'),
+                ('src.strand.strand_graph', 'StrandGraph', 'undo'),
+                ('src.strand.bond_graph', 'BondGraph', 'refresh'),
+                ('src.strand.bond_graph', 'BondGraph', 'find_loops'),
+                ('src.strand.bond_graph', 'BondGraph', 'store_hidden'),
+                ('src.species.species', 'Species', 'derive_canonical_form'),
+                ('src.species.species', 'Species', 'materialize')]
+'''(module, class or None, function) of every instrumented function. Graph updates during the rule checks go
+through change_edges and undo, and the bond graph recomputes its loops and hidden domains in refresh'''
+
+enabled = False
+'''True while the instrumentation is installed'''
+
+counters = {}
+'''counters of the current round, function name mapped to a dictionary of counts'''
+
+rounds = []
+'''counters of the finished rounds'''
+
+originals = []
+'''(owner, attribute, function) replaced by enable()'''
+
+roundstart = 0.
+'''time the current round started'''
+
+
+def get_name(classname, funcname):
+    if classname is None:
+        return funcname
+    if funcname == '__init__':
+        return classname
+    return classname + '.' + funcname
+
+
+def count_free_candidates(args):
+    graph = args[0]
+    return sum(1 for e in graph.A if e not in graph.E)
+
+
+def count_bonded_candidates(args):
+    return len(args[0].E)
+
+
+CANDIDATES = {'check_binding': (count_free_candidates, len),
+              'check_unbinding': (count_bonded_candidates, len),
+              'check_migration': (count_free_candidates, lambda res: len(res[0]) + len(res[1]))}
+'''rule check mapped to functions counting the candidates tested (from the arguments) and accepted (from the result)'''
+
+
+def get_entry(name):
+    if name not in counters:
+        counters[name] = {'calls': 0, 'time': 0.}
+    return counters[name]
+
+
+def wrap(name, func):
+    """
+    wrap a function so that its calls and cumulative time are counted
+
+    :param name: name of the counter
+    :param func: the function
+    :return: the wrapped function
+    """
+    tested, accepted = CANDIDATES.get(name, (None, None))
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        before = tested(args) if tested is not None else 0
+        speciesnum = len(args[1]) if name == 'check_existence' else 0
+        start = time.perf_counter()
+        res = func(*args, **kwargs)
+        entry = get_entry(name)
+        entry['time'] += time.perf_counter() - start
+        entry['calls'] += 1
+        if tested is not None:
+            entry['tested'] = entry.get('tested', 0) + before
+            entry['accepted'] = entry.get('accepted', 0) + accepted(res)
+        elif name == 'check_existence':
+            key = 'new' if len(res[0]) > speciesnum else 'duplicates'
+            entry[key] = entry.get(key, 0) + 1
+        return res
+    return wrapper
+
+
+def enable():
+    """
+    install the instrumentation and clear all counters
+    """
+    global enabled, counters, rounds, roundstart
+    import importlib
+
+    if not enabled:
+        for modulename, classname, funcname in INSTRUMENTED:
+            owner = importlib.import_module(modulename)
+            if classname is not None:
+                owner = getattr(owner, classname)
+            func = getattr(owner, funcname)
+            originals.append((owner, funcname, func))
+            setattr(owner, funcname, wrap(get_name(classname, funcname), func))
+        enabled = True
+    counters = {}
+    rounds = []
+    roundstart = time.perf_counter()
+
+
+def disable():
+    """
+    remove the instrumentation, the counters are kept for report()
+    """
+    global enabled
+    while len(originals) != 0:
+        owner, funcname, func = originals.pop()
+        setattr(owner, funcname, func)
+    enabled = False
+
+
+def end_round(roundnum):
+    """
+    close the counters of an enumeration round
+
+    :param roundnum: number of the round
+    """
+    global counters, roundstart
+    now = time.perf_counter()
+    rounds.append(summarize(counters, {'round': roundnum, 'time': now - roundstart}))
+    counters = {}
+    roundstart = now
+
+
+def summarize(entries, info):
+    """
+    :param entries: counters of some rounds
+    :param info: dictionary to add the counters to
+    :return: info with the counters and the ratio of produced species that already existed
+    """
+    existence = entries.get('check_existence', {})
+    new = existence.get('new', 0)
+    duplicates = existence.get('duplicates', 0)
+    info['duplicate_ratio'] = duplicates / (new + duplicates) if new + duplicates != 0 else 0.
+    info['functions'] = entries
+    return info
+
+
+def report():
+    """
+    :return: dictionary with the counters of every round and their totals
+    """
+    total = {}
+    for r in rounds + [{'functions': counters}]:
+        for name, entry in r['functions'].items():
+            if name not in total:
+                total[name] = {}
+            for key, val in entry.items():
+                total[name][key] = total[name].get(key, 0) + val
+    return {'rounds': rounds,
+            'total': summarize(total, {'time': sum(r['time'] for r in rounds)})}
+
+
+def dump(filename):
+    """
+    write report() as JSON
+
+    :param filename: path of the JSON file
+    """
+    with open(filename, 'w') as fp:
+        json.dump(report(), fp, indent=1)
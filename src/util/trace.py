@@ -0,0 +1,81 @@
+"""
+Tracing of the enumeration. Tracing is off by default, the hot paths only test a flag then;
+set_tracer() installs a callback that receives Record objects.
+"""
+from collections import namedtuple
+import logging
+
+DEBUG = logging.DEBUG
+'''level of candidate edges accepted by the rule checks'''
+
+INFO = logging.INFO
+'''level of the progress of enumeration rounds'''
+
+OFF = logging.CRITICAL + 10
+'''level that disables tracing'''
+
+Record = namedtuple('Record', ['level', 'kind', 'data'])
+'''trace record: level, kind ('RB', 'RU', 'R3', 'R4' or 'round') and the data of the record.
+The data is the candidate edge (a frozenset of two domains) for rules, a dictionary for rounds'''
+
+tracer = None
+'''callback receiving the records, None if tracing is off'''
+
+level = OFF
+'''lowest level that is passed to the tracer'''
+
+
+def set_tracer(callback, lvl=DEBUG):
+    """
+    install a tracer, it only sees records of the current process
+
+    :param callback: function taking a Record, None to turn tracing off
+    :param lvl: lowest level of the records passed to the callback
+    """
+    global tracer, level
+    tracer = callback
+    level = lvl if callback is not None else OFF
+
+
+def enabled(lvl):
+    """
+    :param lvl: level of the record to emit
+    :return: True if records of the level reach the tracer
+    """
+    return level <= lvl
+
+
+def emit(lvl, kind, data):
+    """
+    pass a record to the tracer, callers check enabled() first so that no record is built when tracing is off
+
+    :param lvl: level of the record
+    :param kind: kind of the record
+    :param data: data of the record
+    """
+    if level <= lvl:
+        tracer(Record(lvl, kind, data))
+
+
+def format_record(record):
+    """
+    :param record: a Record object
+    :return: text of the record, e.g. RB: {(0, 1), (1, 2)}
+    """
+    if isinstance(record.data, frozenset):
+        return record.kind + ': ' + str(set(record.data))
+    return record.kind + ': ' + ', '.join(str(k) + ' ' + str(v) for k, v in record.data.items())
+
+
+def print_record(record):
+    """
+    tracer printing the records to stdout
+    """
+    print(format_record(record))
+
+
+def log_record(record):
+    """
+    tracer passing the records to the 'dsdpy' logger at their level
+    """
+    logging.getLogger('dsdpy').log(record.level, format_record(record))
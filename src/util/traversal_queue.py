@@ -0,0 +1,53 @@
+from collections import deque
+
+
+class TraversalQueue:
+    """
+    FIFO queue for graph traversals. It keeps the put/get/empty interface of queue.Queue without
+    the locking, and tracks the queued items so membership tests are O(1)
+    """
+
+    items = None
+    '''deque of queued items in FIFO order'''
+
+    members = {}
+    '''queued items mapped to the number of times they are queued'''
+
+    def __init__(self):
+        self.items = deque()
+        self.members = {}
+
+    def __contains__(self, item):
+        return item in self.members
+
+    def __len__(self):
+        return len(self.items)
+
+    def put(self, item):
+        """
+        append an item to the end of the queue
+
+        :param item: a hashable item
+        """
+        self.items.append(item)
+        self.members[item] = self.members.get(item, 0) + 1
+
+    def get(self):
+        """
+        take out the item at the front of the queue
+
+        :return: the item
+        """
+        item = self.items.popleft()
+        cnt = self.members[item]
+        if cnt == 1:
+            del self.members[item]
+        else:
+            self.members[item] = cnt - 1
+        return item
+
+    def empty(self):
+        """
+        :return: True if there is no item in the queue, False otherwise
+        """
+        return len(self.items) == 0
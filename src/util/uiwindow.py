@@ -44,6 +44,9 @@ class Ui_MainWindow(QObject):
         self.comboBox_simumode.setObjectName("comboBox_simumode")
         self.comboBox_simumode.addItem("")
         self.comboBox_simumode.addItem("")
+        self.comboBox_simumode.addItem("")
+        self.comboBox_simumode.addItem("")
+        self.comboBox_simumode.addItem("")
         self.horizontalLayout_2.addWidget(self.comboBox_simumode)
         self.pushButton_simu = QtWidgets.QPushButton(self.frame)
         font = QtGui.QFont()
@@ -225,6 +228,9 @@ class Ui_MainWindow(QObject):
         self.pushButton_save.setText(_translate("MainWindow", "Save Network"))
         self.comboBox_simumode.setItemText(0, _translate("MainWindow", "Stochastic"))
         self.comboBox_simumode.setItemText(1, _translate("MainWindow", "Deterministic"))
+        self.comboBox_simumode.setItemText(2, _translate("MainWindow", "Stochastic (native)"))
+        self.comboBox_simumode.setItemText(3, _translate("MainWindow", "Deterministic (native)"))
+        self.comboBox_simumode.setItemText(4, _translate("MainWindow", "Stochastic ensemble"))
         self.pushButton_analyze.setText(_translate("MainWindow", "Generate"))
 
     @pyqtSlot()
@@ -1,4 +1,3 @@
-from itertools import combinations
 import copy
 
 
@@ -58,18 +57,6 @@ def get_free_domains(limits, blocks, bound):
     return interval
 
 
-def get_combinations(oldlen, newlen, cursor, indexlist):
-    combold = list(combinations(indexlist[cursor:oldlen], 2))
-    combself = [(i, i) for i in range(0, oldlen)]
-    combnew = []
-
-    if oldlen != newlen:
-        for i in range(0, oldlen):
-            for j in range(oldlen, newlen):
-                combnew.append((i, j))
-    return combold + combnew + combself
-
-
 def get_migrate_nodes(edges, indices, startstrand):
     d = []
     for i in indices: